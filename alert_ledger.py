@@ -0,0 +1,70 @@
+import json
+import os
+
+from vps_record import format_date, parse_date
+from vps_store import atomic_write
+
+
+class AlertLedger:
+    """已发送到期提醒的记录：同一台VPS、同一个到期日、同一个剩余天数只提醒一次
+
+    记录保存在 alert_state.json 中，按 scope 区分不同的发送方（如 vps_monitor 和 ding_monitor），
+    过了提醒当天后自动清理
+    """
+
+    def __init__(self, path='alert_state.json', scope='vps'):
+        self.path = path
+        self.scope = scope
+        self.sent = self._read().get(scope, {})
+        self.dirty = False
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def key(name, due, days_left):
+        return f"{name}|{format_date(due)}|{days_left}"
+
+    def _alert_key(self, alert, today):
+        # 多个页面时提醒为 (record, 剩余天数, 来源)，不同来源的同名VPS分别记录
+        record, days_left = alert[0], alert[1]
+        name = record.name if len(alert) < 3 or alert[2] is None else f"{alert[2]}|{record.name}"
+        return self.key(name, today + days_left, days_left)
+
+    def unsent(self, alerts, today):
+        """过滤出尚未发送过的提醒；alerts 为 [(record, 剩余天数[, 来源]), ...]，today 为日期序数"""
+        return [alert for alert in alerts if self._alert_key(alert, today) not in self.sent]
+
+    def mark(self, alerts, today):
+        # 剩余天数每天都不同，记录只在提醒当天有用，值为提醒日期
+        for alert in alerts:
+            self.sent[self._alert_key(alert, today)] = format_date(today)
+            self.dirty = True
+
+    def prune(self, today):
+        """删除提醒日期已经过去的记录（已过期VPS的每日提醒也能正确去重）"""
+        expired = [key for key, due in self.sent.items() if (parse_date(due) or 0) < today]
+        for key in expired:
+            del self.sent[key]
+        if expired:
+            self.dirty = True
+        return len(expired)
+
+    def save(self, today=None):
+        if today is not None:
+            self.prune(today)
+        if not self.dirty:
+            return False
+        # 重新读取文件，只替换自己的 scope，避免覆盖其他程序写入的记录
+        state = self._read()
+        state[self.scope] = self.sent
+        atomic_write(self.path, json.dumps(state, ensure_ascii=False, indent=1, sort_keys=True))
+        self.dirty = False
+        return True
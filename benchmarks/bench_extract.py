@@ -0,0 +1,91 @@
+"""对比 extract_vps_services 旧的正则流水线与单遍扫描解析器
+
+用法: python benchmarks/bench_extract.py [记录数 ...]
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vps_parser import iter_vps_services  # noqa: E402
+
+
+def legacy_extract(html_content):
+    """旧版 ding_monitor.extract_vps_services 的解析流程（去掉了打印）"""
+    pattern = r'const\s+vpsServices\s*=\s*(\[\s*{[\s\S]*?\}\s*\]);'
+    match = re.search(pattern, html_content)
+    if not match:
+        return []
+    py_array = re.sub(r'//.*?\n', '\n', match.group(1))
+    py_array = py_array.replace("'", '"')
+    py_array = re.sub(r'([{,]\s*)(\w+):', r'\1"\2":', py_array)
+    objects = re.findall(r'{[^{]*?}(?=\s*[,\]])', py_array)
+    processed_objects = []
+    for obj in objects:
+        obj_dict = {}
+        name_match = re.search(r'"name"\s*:\s*"([^"]+)"', obj)
+        cost_match = re.search(r'"cost"\s*:\s*([0-9.]+)', obj)
+        currency_match = re.search(r'"currency"\s*:\s*"([^"]+)"', obj)
+        color_match = re.search(r'"color"\s*:\s*"([^"]+)"', obj)
+        expire_date_match = re.search(r'"expireDate"\s*:\s*"([^"]+)"', obj)
+        monthly_expire_match = re.search(r'"monthlyExpireDay"\s*:\s*([0-9]+)', obj)
+        if name_match and cost_match and currency_match:
+            obj_dict["name"] = name_match.group(1)
+            obj_dict["cost"] = float(cost_match.group(1))
+            obj_dict["currency"] = currency_match.group(1)
+            if color_match:
+                obj_dict["color"] = color_match.group(1)
+            if expire_date_match:
+                obj_dict["expireDate"] = expire_date_match.group(1)
+            if monthly_expire_match:
+                obj_dict["monthlyExpireDay"] = int(monthly_expire_match.group(1))
+            processed_objects.append(obj_dict)
+    return json.loads(json.dumps(processed_objects, ensure_ascii=False))
+
+
+def make_page(count, seed=0):
+    rng = random.Random(seed)
+    services = [
+        {
+            'name': f'VPS-{i}',
+            'cost': round(rng.uniform(1, 200), 2),
+            'currency': rng.choice(['USD', 'CNY', 'EUR', 'HKD']),
+            'billingCycle': rng.choice(['Monthly', 'Annually']),
+            'nextDueDate': f'2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+            'url': f'https://example.com/clientarea.php?id={i}'
+        }
+        for i in range(count)
+    ]
+    return (
+        '<html><script>\n        const vpsServices = ' +
+        json.dumps(services, ensure_ascii=False, indent=4) +
+        ';\n</script></html>'
+    )
+
+
+def best_of(func, arg, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(sizes):
+    print(f"{'记录数':>8} {'正则流水线(s)':>14} {'单遍扫描(s)':>12} {'加速比':>8}")
+    for count in sizes:
+        page = make_page(count)
+        legacy_time, legacy = best_of(legacy_extract, page)
+        stream_time, stream = best_of(lambda text: list(iter_vps_services(text)), page)
+        assert [s['name'] for s in legacy] == [s['name'] for s in stream]
+        print(f"{count:>8} {legacy_time:>14.4f} {stream_time:>12.4f} {legacy_time / stream_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,64 @@
+"""对比单个数据源与同时请求多个数据源时的汇率更新耗时
+
+用法: python benchmarks/bench_rates.py [轮数]
+启动三个本地替身：一个快、一个慢、一个偶尔返回 503，另有一个数据偏差10%的数据源
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exchange_rates import JSONRateProvider, race  # noqa: E402
+from rate_server import SAMPLE_RATES, start_server  # noqa: E402
+
+
+def timed(func, rounds):
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            pass
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return statistics.median(durations), durations[int(len(durations) * 0.95) - 1]
+
+
+def main(rounds=20):
+    servers = [
+        start_server(delay=0.05),
+        start_server(delay=0.8),
+        start_server(delay=0.1, fail_rate=0.5),
+        start_server(delay=0.02, scale=1.1),
+    ]
+    providers = [
+        JSONRateProvider(f'stand-in-{i}', url + '/v4/latest/{base}')
+        for i, (_, url) in enumerate(servers)
+    ]
+    reference = dict(SAMPLE_RATES)
+
+    print(f"{'方式':<28}{'中位数':>10}{'P95':>10}")
+    for i, provider in enumerate(providers[:3]):
+        median, p95 = timed(lambda: provider.fetch('CNY'), rounds)
+        print(f"{'单个数据源 ' + provider.name:<28}{median * 1000:>8.0f}ms{p95 * 1000:>8.0f}ms")
+    median, p95 = timed(lambda: race(providers, 'CNY', reference=reference), rounds)
+    print(f"{'同时请求全部数据源':<28}{median * 1000:>8.0f}ms{p95 * 1000:>8.0f}ms")
+
+    median, p95 = timed(lambda: race(providers, 'CNY'), rounds)
+    print(f"{'全部数据源（没有缓存）':<28}{median * 1000:>8.0f}ms{p95 * 1000:>8.0f}ms")
+
+    provider, response = race(providers, 'CNY', reference=reference)
+    print(f"\n胜出的数据源: {provider.name} (偏差10%的 stand-in-3 虽然最快，但与参考汇率不一致被跳过)")
+    provider, response = race(providers, 'CNY')
+    print(f"没有缓存时胜出的数据源: {provider.name} (需要两个数据源一致)")
+
+    for server, _ in servers:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,272 @@
+"""VPS清单基准测试：生成不同规模的模拟清单，测量主要操作的耗时并与基准结果比较
+
+用法:
+    python benchmarks/bench_suite.py                          # 1k/10k/100k，输出表格
+    python benchmarks/bench_suite.py --sizes 1000 1000000     # 指定规模（1M 约需数分钟和数GB内存）
+    python benchmarks/bench_suite.py --json results.json      # 同时保存为JSON
+    python benchmarks/bench_suite.py --baseline results.json  # 与之前的结果比较，变慢超过阈值时退出码为1
+
+每个规模在单独的临时目录中运行（index.html、vps_data.db、config.json 和提醒记录都在其中），
+不会修改仓库中的文件，也不会发送任何通知。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rate_server import SAMPLE_RATES  # noqa: E402
+from vps_parser import vps_services_span, VPSServicesNotFound  # noqa: E402
+from vps_store import VPSStore  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SIZES = (1000, 10000, 100000, 1000000)
+CURRENCIES = ('USD', 'USD', 'USD', 'CNY', 'CNY', 'EUR', 'HKD', 'GBP', 'JPY', 'CAD', 'SGD', 'RUB')
+CYCLES = ('Monthly', 'Monthly', 'Quarterly', 'Semi-Annually', 'Annually', 'Annually', 'Biennially', 'Triennially')
+PROVIDERS = ('my.racknerd.com', 'billing.dmit.io', 'cnfaster.com', 'my.hostdare.com', 'clients.bandwagonhost.com')
+# 旧格式数据的比例：只有 expireDate 的、只有 monthlyExpireDay 的
+LEGACY_EXPIRE_RATIO = 0.05
+LEGACY_MONTHLY_RATIO = 0.05
+# 耗时比基准慢超过这个比例、且绝对差值超过 NOISE_FLOOR 秒时视为退化
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR = 0.005
+OPERATIONS = (
+    'load_vps_data[import]', 'load_vps_data[store]', 'save_vps_data', 'check_expiring_vps',
+    'show_currency_stats', 'extract_vps_services', 'check_vps_expiry'
+)
+
+
+def generate_services(count, seed=0, today=None):
+    """生成 count 台VPS的 vpsServices 数组：多种币种和计费周期，约10%为旧格式（expireDate/monthlyExpireDay）
+
+    到期日分布在今天前30天到之后400天之间，因此每个规模都有一部分VPS落在提醒范围内
+    """
+    rng = random.Random(seed)
+    today = today or date.today().toordinal()
+    services = []
+    for i in range(count):
+        service = {
+            'name': f'VPS-{i:07d}',
+            'cost': round(rng.uniform(1, 300), 2),
+            'currency': rng.choice(CURRENCIES),
+        }
+        due = date.fromordinal(today + rng.randint(-30, 400)).isoformat()
+        kind = rng.random()
+        if kind < LEGACY_EXPIRE_RATIO:
+            service['expireDate'] = due
+            service['color'] = rng.choice(('red', 'green', 'blue'))
+        elif kind < LEGACY_EXPIRE_RATIO + LEGACY_MONTHLY_RATIO:
+            service['monthlyExpireDay'] = rng.randint(1, 31)
+        else:
+            service['billingCycle'] = rng.choice(CYCLES)
+            service['nextDueDate'] = due
+            service['url'] = f'https://{rng.choice(PROVIDERS)}/clientarea.php?action=productdetails&id={i}'
+        services.append(service)
+    return services
+
+
+def dashboard_template():
+    """仓库中 index.html 的页面和脚本（去掉其中的数据），找不到时用一个最小的页面"""
+    try:
+        with open(os.path.join(ROOT, 'index.html'), 'r', encoding='utf-8') as f:
+            content = f.read()
+        start, end = vps_services_span(content)
+        return content[:start], content[end:]
+    except (OSError, VPSServicesNotFound):
+        return '<html><body><script>\n        const vpsServices = ', ';\n</script></body></html>'
+
+
+def make_page(services, template=None):
+    head, tail = template or dashboard_template()
+    return head + 'vpsServices = ' + json.dumps(services, ensure_ascii=False, indent=4) + tail
+
+
+@contextlib.contextmanager
+def workspace(page):
+    """在临时目录中准备 index.html 和不启用任何通知的 config.json，结束后删除"""
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp(prefix='vps-bench-')
+    try:
+        os.chdir(directory)
+        with open('index.html', 'w', encoding='utf-8') as f:
+            f.write(page)
+        with open('config.json', 'w') as f:
+            json.dump({
+                "telegram": {"enabled": False, "bot_token": "", "chat_id": ""},
+                "dingtalk": {"enabled": False, "webhook": "", "secret": ""},
+                "change_notify_window": 0
+            }, f)
+        yield directory
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure(func, repeat, setup=None):
+    """运行 repeat 次，返回每次的耗时（秒）；setup 的耗时不计入，输出被丢弃"""
+    durations = []
+    for i in range(repeat):
+        if setup:
+            setup(i)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations):
+    return {
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'max': max(durations),
+        'runs': len(durations)
+    }
+
+
+def run_size(count, repeat=3, seed=0):
+    """在一个临时目录中测量 count 台VPS时各操作的耗时，返回 {操作: 统计}"""
+    page = make_page(generate_services(count, seed))
+    results = {}
+    with workspace(page):
+        # 模块在临时目录中导入，日志也写到临时目录
+        from vps_manager import VPSManager
+        import ding_monitor
+        import vps_monitor
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager = VPSManager()
+        manager.exchange_rates = dict(SAMPLE_RATES)
+
+        # 首次运行：从 index.html 解析并导入到新的数据存储
+        def fresh_store(i):
+            manager.store.close()
+            manager.store = VPSStore(f'import-{i}.db')
+        results['load_vps_data[import]'] = summarize(measure(manager.load_vps_data, repeat, fresh_store))
+        manager.store.close()
+        manager.store = VPSStore()
+        # 之后的运行：index.html 没有修改，直接从数据存储读取
+        results['load_vps_data[store]'] = summarize(measure(manager.load_vps_data, repeat))
+
+        # 修改一台VPS后保存：写入数据存储并重新生成 index.html
+        def touch(i):
+            manager.vps_data[0].cost += 1
+            manager.queue_put(0)
+        results['save_vps_data'] = summarize(measure(manager.save_vps_data, repeat, touch))
+
+        results['check_expiring_vps'] = summarize(measure(manager.check_expiring_vps, repeat))
+        results['show_currency_stats'] = summarize(measure(manager.show_currency_stats, repeat))
+
+        with open('index.html', 'r', encoding='utf-8') as f:
+            html = f.read()
+        extracted = []
+        results['extract_vps_services'] = summarize(
+            measure(lambda: extracted.append(len(ding_monitor.extract_vps_services(html))), repeat)
+        )
+        if extracted[-1] != count:
+            raise RuntimeError(f"extract_vps_services 只读取到 {extracted[-1]} / {count} 台VPS")
+
+        results['check_vps_expiry'] = summarize(measure(vps_monitor.check_vps_expiry, repeat))
+        manager.store.close()
+    return results
+
+
+def environment():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': numpy_version,
+        'time': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, noise_floor=NOISE_FLOOR):
+    """与基准结果比较中位数，返回 [(规模, 操作, 基准, 当前, 比例, 是否退化), ...]"""
+    rows = []
+    for size, operations in results['results'].items():
+        for operation, stats in operations.items():
+            old = baseline.get('results', {}).get(size, {}).get(operation)
+            if not old:
+                continue
+            ratio = stats['median'] / old['median'] if old['median'] else float('inf')
+            regressed = ratio > 1 + tolerance and stats['median'] - old['median'] > noise_floor
+            rows.append((size, operation, old['median'], stats['median'], ratio, regressed))
+    return rows
+
+
+def print_table(results):
+    sizes = list(results['results'])
+    print(f"{'操作':<24}" + ''.join(f"{int(size):>12,}" for size in sizes))
+    for operation in OPERATIONS:
+        cells = []
+        for size in sizes:
+            stats = results['results'][size].get(operation)
+            cells.append(f"{stats['median'] * 1000:>10.1f}ms" if stats else f"{'-':>12}")
+        print(f"{operation:<24}" + ''.join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='VPS清单基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help=f"清单规模，默认 {' '.join(map(str, DEFAULT_SIZES))}（完整为 {' '.join(map(str, SIZES))}）")
+    parser.add_argument('--repeat', type=int, default=3, help='每个操作的运行次数，取中位数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help='把结果保存为JSON（"-" 为标准输出）')
+    parser.add_argument('--baseline', metavar='FILE', help='与之前保存的JSON结果比较')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='允许变慢的比例，默认0.25')
+    args = parser.parse_args(argv)
+
+    results = {'environment': environment(), 'repeat': args.repeat, 'results': {}}
+    for count in args.sizes:
+        print(f">>> {count} 台VPS ...", file=sys.stderr)
+        results['results'][str(count)] = run_size(count, args.repeat, args.seed)
+
+    if args.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(results)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"\n结果已保存到 {args.json}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.tolerance)
+    regressions = [row for row in rows if row[5]]
+    out = sys.stderr if args.json == '-' else sys.stdout
+    print(f"\n与基准比较 ({args.baseline}，允许变慢 {args.tolerance:.0%}):", file=out)
+    for size, operation, old, new, ratio, regressed in rows:
+        mark = '✗ 退化' if regressed else ''
+        print(f"  {int(size):>9,} {operation:<24} {old * 1000:>10.1f}ms -> {new * 1000:>10.1f}ms {ratio:>6.2f}x {mark}",
+              file=out)
+    if regressions:
+        print(f"共 {len(regressions)} 项退化", file=out)
+        return 1
+    print("没有发现退化", file=out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""通知发送压测：通过本地API替身测量 Telegram、钉钉、Webhook 通道的吞吐量和延迟分位数
+
+用法:
+    python benchmarks/load_test.py                                  # 启动内置替身，每个聊天/机器人发送5条
+    python benchmarks/load_test.py --messages 20 --chats 30 --delay 0.1 --jitter 0.2 --fail-rate 0.05
+    python benchmarks/load_test.py --no-limiter                     # 关闭客户端限速，测试 429/retry_after 的处理
+    python benchmarks/load_test.py --url http://127.0.0.1:8765      # 使用已经运行的替身（mock_api.py）
+    python benchmarks/load_test.py --json result.json
+
+发送走正常的 NotificationDispatcher 和 http_client（连接池、429 重试、客户端限速），
+延迟为单次 send 的耗时（含 429 后的重试等待），不含在客户端限速器中排队的时间。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_api import start_server  # noqa: E402
+from notifier import (DingTalkChannel, Notification, NotificationDispatcher,  # noqa: E402
+                      TelegramChannel, WebhookChannel)
+
+SECRET = 'SEC-load-test'
+PERCENTILES = (50, 90, 99)
+
+
+class TimedChannel:
+    """包装一个通道，记录每次发送的耗时和结果；限速器、key 与原通道相同"""
+
+    def __init__(self, channel, kind):
+        self.channel = channel
+        self.kind = kind
+        self.name = channel.name
+        self.key = channel.key
+        self.limiters = channel.limiters
+        self.samples = []
+
+    def send(self, notification):
+        start = time.perf_counter()
+        try:
+            self.channel.send(notification)
+        except Exception as e:
+            self.samples.append((start, time.perf_counter(), e))
+            raise
+        self.samples.append((start, time.perf_counter(), None))
+
+
+def percentile(values, p):
+    """最近秩法分位数，values 须已排序"""
+    if not values:
+        return None
+    index = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def build_channels(base_url, chats, bots, webhooks, limiter=True):
+    """每个聊天/机器人/Webhook 一个通道，地址都指向替身"""
+    channels = [TimedChannel(TelegramChannel('123456:LOADTEST', f'{-1000 - i}', None, api_base=base_url), 'telegram')
+                for i in range(chats)]
+    channels += [TimedChannel(DingTalkChannel(f'https://oapi.dingtalk.com/robot/send?access_token=load{i}', SECRET,
+                                              api_base=base_url), 'dingtalk')
+                 for i in range(bots)]
+    channels += [TimedChannel(WebhookChannel(f'{base_url}/webhook?hook={i}'), 'webhook') for i in range(webhooks)]
+    if not limiter:
+        for channel in channels:
+            channel.limiters = []
+    return channels
+
+
+async def run(channels, messages, concurrency):
+    """每个通道发送 messages 条通知，各通道同时进行，返回 (发送结果, 总耗时)"""
+    notifications = [Notification(f'压测消息 #{i}\n<b>VPS-{i:04d}</b>: 还有 3 天到期', title='压测')
+                     for i in range(messages)]
+    # 每个通道的发送在线程中进行，默认线程池只有 CPU核数+4 个线程，重试等待时会互相阻塞
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=len(channels) * concurrency))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        NotificationDispatcher([channel], concurrency).dispatch(*notifications) for channel in channels
+    ))
+    return results, time.perf_counter() - start
+
+
+def summarize(channels, wall):
+    report = {}
+    for kind in ('telegram', 'dingtalk', 'webhook'):
+        group = [channel for channel in channels if channel.kind == kind]
+        if not group:
+            continue
+        samples = [sample for channel in group for sample in channel.samples]
+        latencies = sorted(end - start for start, end, _ in samples)
+        errors = [error for _, _, error in samples if error is not None]
+        finished = max((end for _, end, _ in samples), default=0) - min((start for start, _, _ in samples), default=0)
+        report[kind] = {
+            'channels': len(group),
+            'sent': len(samples) - len(errors),
+            'errors': len(errors),
+            'error_samples': sorted({str(error)[:120] for error in errors})[:5],
+            'throughput': (len(samples) - len(errors)) / finished if finished > 0 else None,
+            'latency': {f'p{p}': percentile(latencies, p) for p in PERCENTILES},
+            'latency_max': latencies[-1] if latencies else None
+        }
+    report['wall_time'] = wall
+    return report
+
+
+def fetch_stats(base_url):
+    with urllib.request.urlopen(f'{base_url}/_stats', timeout=5) as response:
+        return json.loads(response.read())
+
+
+def print_report(report, stats):
+    print(f"{'通道':<10}{'数量':>6}{'成功':>8}{'失败':>6}{'条/秒':>10}" +
+          ''.join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'最大':>10}")
+    for kind, row in report.items():
+        if not isinstance(row, dict):
+            continue
+        throughput = f"{row['throughput']:.1f}" if row['throughput'] else '-'
+        latencies = ''.join(f"{row['latency'][f'p{p}'] * 1000:>8.0f}ms" for p in PERCENTILES)
+        print(f"{kind:<10}{row['channels']:>6}{row['sent']:>8}{row['errors']:>6}{throughput:>10}"
+              f"{latencies}{row['latency_max'] * 1000:>8.0f}ms")
+        for error in row['error_samples']:
+            print(f"    {error}")
+    print(f"\n总耗时 {report['wall_time']:.2f}s")
+    print("替身统计: " + ', '.join(f"{key}={value}" for key, value in sorted(stats.items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='通知发送压测（本地API替身）')
+    parser.add_argument('--url', help='已经运行的替身地址；不指定时在进程内启动一个')
+    parser.add_argument('--messages', type=int, default=5, help='每个聊天/机器人/Webhook 发送的条数')
+    parser.add_argument('--chats', type=int, default=20, help='Telegram 聊天数量（共用一个机器人）')
+    parser.add_argument('--bots', type=int, default=4, help='钉钉机器人数量（每个每分钟最多20条）')
+    parser.add_argument('--webhooks', type=int, default=4, help='Webhook 数量（不限速）')
+    parser.add_argument('--concurrency', type=int, default=4, help='每个通道的最大并发请求数')
+    parser.add_argument('--no-limiter', action='store_true', help='关闭客户端限速，由替身返回 429/限流错误')
+    parser.add_argument('--delay', type=float, default=0.02, help='替身的响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.03, help='替身的额外随机延迟上限（秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='替身返回 503 的概率')
+    parser.add_argument('--json', metavar='FILE', help='把结果保存为JSON（"-" 为标准输出）')
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_server(delay=args.delay, jitter=args.jitter, fail_rate=args.fail_rate, secret=SECRET)
+    channels = build_channels(base_url, args.chats, args.bots, args.webhooks, not args.no_limiter)
+    total = len(channels) * args.messages
+    print(f">>> 向 {len(channels)} 个通道各发送 {args.messages} 条（共 {total} 条），替身: {base_url}", file=sys.stderr)
+    try:
+        _, wall = asyncio.run(run(channels, args.messages, args.concurrency))
+        report = summarize(channels, wall)
+        report['server'] = fetch_stats(base_url)
+    finally:
+        if server:
+            server.shutdown()
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report({k: v for k, v in report.items() if k != 'server'}, report['server'])
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"结果已保存到 {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
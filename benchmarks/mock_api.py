@@ -0,0 +1,270 @@
+"""Telegram、钉钉和汇率API的本地替身，用于压测通知发送和离线运行（CI）
+
+用法: python benchmarks/mock_api.py [--port 8765] [--delay 0.05] [--secret 加签密钥] ...
+然后让程序使用替身:
+    VPS_TELEGRAM_API=http://127.0.0.1:8765 VPS_DINGTALK_API=http://127.0.0.1:8765 \\
+    VPS_RATES_API=http://127.0.0.1:8765 python vps_monitor.py
+或在 config.json 中设置 telegram.api_base、dingtalk.api_base、exchange_rate_api_base
+
+接口:
+    POST /bot<token>/sendMessage     Telegram：超过每个聊天/每个机器人的频率时返回 429 和 parameters.retry_after
+    POST /robot/send?access_token=   钉钉：检查 timestamp/sign 加签，超过每分钟条数时返回 errcode 130101
+    POST /webhook                    通用 Webhook
+    GET  /v4/latest/CNY 等           汇率（exchangerate-api、open-er-api、currency-api、frankfurter 的格式），支持 ETag/304
+    GET  /_stats                     各接口的请求数、429 次数、加签失败次数等
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from rate_server import SAMPLE_RATES
+
+# 钉钉签名的时间戳与服务器时间最多相差1小时
+SIGN_WINDOW = 60 * 60
+# 频率限制允许的计时误差（秒）：客户端按间隔放行时，请求到达的间隔会有几毫秒的抖动
+RATE_SLACK = 0.05
+
+
+class SlidingWindow:
+    """最近 per 秒内最多 limit 次；超出时返回需要等待的秒数"""
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.hits = defaultdict(deque)
+        self.lock = threading.Lock()
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self.lock:
+            hits = self.hits[key]
+            while hits and now - hits[0] >= self.per - RATE_SLACK:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return self.per - RATE_SLACK - (now - hits[0])
+            hits.append(now)
+            return 0
+
+
+class MockState:
+    """替身的行为参数和统计：delay/jitter 为响应延迟，fail_rate 为返回 503 的概率"""
+
+    def __init__(self, delay=0.0, jitter=0.0, fail_rate=0.0, secret='',
+                 chat_rate=1, bot_rate=30, dingtalk_rate=20, rates=None):
+        self.delay = delay
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.secret = secret
+        self.chat_window = SlidingWindow(chat_rate, 1)
+        self.bot_window = SlidingWindow(bot_rate, 1)
+        self.dingtalk_window = SlidingWindow(dingtalk_rate, 60)
+        self.rates = dict(rates or SAMPLE_RATES)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def rates_for(self, base):
+        """以 base 为基准的汇率（样例数据以 CNY 为基准）"""
+        if base not in self.rates:
+            return None
+        return {currency: rate / self.rates[base] for currency, rate in self.rates.items()}
+
+    def check_sign(self, query):
+        """钉钉加签校验，通过时返回 None，否则返回错误信息"""
+        if not self.secret:
+            return None
+        timestamp, sign = query.get('timestamp', [''])[0], query.get('sign', [''])[0]
+        if not timestamp or not sign:
+            return 'sign not match, missing timestamp or sign'
+        try:
+            if abs(time.time() * 1000 - int(timestamp)) > SIGN_WINDOW * 1000:
+                return 'invalid timestamp'
+        except ValueError:
+            return 'invalid timestamp'
+        string_to_sign = f'{timestamp}\n{self.secret}'.encode('utf-8')
+        expected = base64.b64encode(hmac.new(self.secret.encode('utf-8'), string_to_sign, hashlib.sha256).digest())
+        if not hmac.compare_digest(expected.decode('ascii'), sign):
+            return 'sign not match'
+        return None
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        # 保持连接，客户端的连接池才能复用
+        protocol_version = 'HTTP/1.1'
+
+        def reply(self, status, body=None, headers=None):
+            # 延迟放在处理之后、响应之前，频率限制按请求到达的时间计算
+            if not self.path.startswith('/_stats'):
+                time.sleep(state.delay + random.uniform(0, state.jitter))
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8') if body is not None else b''
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            if body is not None:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def failed(self, endpoint):
+            if random.random() < state.fail_rate:
+                state.count(f'{endpoint}.503')
+                self.reply(503, {'error': 'service unavailable'})
+                return True
+            return False
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path == '/_stats':
+                self.reply(200, state.snapshot())
+                return
+            state.count('rates.requests')
+            if self.failed('rates'):
+                return
+            query = parse_qs(parts.query)
+            if parts.path.endswith('.json'):
+                # currency-api: /.../currencies/cny.json -> {"cny": {"usd": ...}}
+                base = parts.path.rsplit('/', 1)[-1][:-5].upper()
+                rates = state.rates_for(base)
+                body = rates and {'date': time.strftime('%Y-%m-%d'),
+                                  base.lower(): {c.lower(): r for c, r in rates.items()}}
+            elif 'from' in query:
+                # frankfurter: /latest?from=CNY，结果中不包含基准币种
+                base = query['from'][0].upper()
+                rates = state.rates_for(base)
+                body = rates and {'base': base, 'rates': {c: r for c, r in rates.items() if c != base}}
+            else:
+                # exchangerate-api / open-er-api: /v4/latest/CNY
+                base = parts.path.rstrip('/').rsplit('/', 1)[-1].upper()
+                rates = state.rates_for(base)
+                body = rates and {'base': base, 'rates': rates}
+            if not body:
+                self.reply(404, {'error': f'unsupported base: {base}'})
+                return
+            etag = f'"{hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]}"'
+            if self.headers.get('If-None-Match') == etag:
+                state.count('rates.304')
+                self.reply(304)
+                return
+            self.reply(200, body, {'ETag': etag})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                payload = None
+            parts = urlsplit(self.path)
+            if parts.path.endswith('/sendMessage') and parts.path.startswith('/bot'):
+                self.telegram(parts.path[4:-len('/sendMessage')], payload)
+            elif parts.path == '/robot/send':
+                self.dingtalk(parse_qs(parts.query), payload)
+            elif parts.path == '/webhook':
+                state.count('webhook.requests')
+                if not self.failed('webhook'):
+                    self.reply(200, {'ok': True})
+            else:
+                self.reply(404, {'error': 'not found'})
+
+        def telegram(self, token, payload):
+            state.count('telegram.requests')
+            if self.failed('telegram'):
+                return
+            if not isinstance(payload, dict) or not payload.get('chat_id') or not payload.get('text'):
+                state.count('telegram.400')
+                self.reply(400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: message text is empty'})
+                return
+            wait = state.bot_window.hit(token) or state.chat_window.hit((token, payload['chat_id']))
+            if wait:
+                retry_after = max(int(wait + 0.999), 1)
+                state.count('telegram.429')
+                self.reply(429, {
+                    'ok': False, 'error_code': 429,
+                    'description': f'Too Many Requests: retry after {retry_after}',
+                    'parameters': {'retry_after': retry_after}
+                })
+                return
+            state.count('telegram.sent')
+            self.reply(200, {'ok': True, 'result': {'message_id': state.stats['telegram.sent'],
+                                                     'chat': {'id': payload['chat_id']}, 'text': payload['text']}})
+
+        def dingtalk(self, query, payload):
+            # 钉钉的业务错误也返回 HTTP 200，错误码在 errcode 中
+            state.count('dingtalk.requests')
+            if self.failed('dingtalk'):
+                return
+            token = query.get('access_token', [''])[0]
+            if not token:
+                state.count('dingtalk.token_error')
+                self.reply(200, {'errcode': 300001, 'errmsg': 'token is not exist'})
+                return
+            error = state.check_sign(query)
+            if error:
+                state.count('dingtalk.sign_error')
+                self.reply(200, {'errcode': 310000, 'errmsg': error})
+                return
+            if not isinstance(payload, dict) or payload.get('msgtype') not in ('text', 'markdown'):
+                self.reply(200, {'errcode': 40035, 'errmsg': 'invalid msgtype'})
+                return
+            if state.dingtalk_window.hit(token):
+                state.count('dingtalk.throttled')
+                self.reply(200, {'errcode': 130101, 'errmsg': 'send too fast, exceed 20 times per minute'})
+                return
+            state.count('dingtalk.sent')
+            self.reply(200, {'errcode': 0, 'errmsg': 'ok'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **options):
+    """在后台线程启动替身，返回 (server, base_url)；server.state 为 MockState，用 server.shutdown() 停止"""
+    state = MockState(**options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telegram、钉钉和汇率API的本地替身')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0, help='每个响应的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外的随机延迟上限（秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='返回 503 的概率')
+    parser.add_argument('--secret', default='', help='钉钉加签密钥，为空时不检查签名')
+    parser.add_argument('--chat-rate', type=int, default=1, help='Telegram 每个聊天每秒的条数上限')
+    parser.add_argument('--bot-rate', type=int, default=30, help='Telegram 每个机器人每秒的条数上限')
+    parser.add_argument('--dingtalk-rate', type=int, default=20, help='钉钉每个机器人每分钟的条数上限')
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(MockState(
+        args.delay, args.jitter, args.fail_rate, args.secret, args.chat_rate, args.bot_rate, args.dingtalk_rate
+    )))
+    print(f"API替身运行在 http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
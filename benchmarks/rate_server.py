@@ -0,0 +1,68 @@
+"""本地汇率API替身，用于测试和压测 exchange_rates 的多数据源请求
+
+用法: python benchmarks/rate_server.py [端口] [延迟秒数] [失败率]
+接口与 exchangerate-api 相同: GET /v4/latest/CNY -> {"base": "CNY", "rates": {...}}，支持 ETag/304
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_RATES = {
+    'CNY': 1, 'USD': 0.138, 'EUR': 0.128, 'HKD': 1.08, 'JPY': 21.7, 'GBP': 0.11,
+    'AUD': 0.21, 'CAD': 0.195, 'SGD': 0.18, 'KRW': 193.5, 'TWD': 4.46, 'RUB': 11.2,
+    'CHF': 0.112, 'SEK': 1.31, 'NOK': 1.43, 'DKK': 0.954, 'THB': 4.52, 'MYR': 0.59,
+    'INR': 12.41, 'BRL': 0.759
+}
+
+
+def make_handler(delay=0.0, fail_rate=0.0, scale=1.0, rates=None):
+    """delay 为响应延迟，fail_rate 为返回 503 的概率，scale 用来模拟数据偏差的数据源"""
+    rates = {c: r if c == 'CNY' else r * scale for c, r in (rates or SAMPLE_RATES).items()}
+    body = json.dumps({'base': 'CNY', 'rates': rates}).encode('utf-8')
+    etag = f'"{hash(body) & 0xffffffff:08x}"'
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **options):
+    """在后台线程启动，返回 (server, 基础URL)；用 server.shutdown() 停止"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(**options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(delay, fail_rate))
+    print(f"汇率API替身已启动: http://127.0.0.1:{port}/v4/latest/CNY (延迟 {delay}s，失败率 {fail_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import run_metrics
+from vps_record import VPSRecord
+from vps_shards import check_loaded, script_locations
+from vps_store import atomic_write
+
+USER_AGENT = 'vps-date-monitor (+https://github.com/woniu336/vps-date)'
+CACHE_FILE = 'dashboard_cache.json'
+# 同时获取的页面数量上限
+MAX_WORKERS = 8
+
+_cache_lock = threading.Lock()
+
+
+class DashboardSource:
+    """监控页面（URL 或本地文件）：保存 ETag/Last-Modified（本地文件为 mtime/大小）、内容哈希和解析结果
+
+    服务端返回 304 或本地文件未修改时不读取页面内容，内容哈希没有变化时不重新解析，直接使用缓存的服务列表。
+    分片模式的页面引用的每个分片文件（相对于页面地址）同样按自己的 ETag 和哈希缓存。
+    缓存保存在 dashboard_cache.json 中，重启后同样有效
+    """
+
+    def __init__(self, location, parse, name=None, cache_file=CACHE_FILE):
+        self.location = location
+        self.name = name or location
+        self.parse = parse
+        self.cache_file = cache_file
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self.services = None
+        self.shards = []
+        self._shard_sources = {}
+        self._load_cache()
+
+    def _read_cache_file(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _load_cache(self):
+        entry = self._read_cache_file().get(self.location)
+        if not entry:
+            return
+        try:
+            self.services = [VPSRecord.from_dict(item) for item in entry['services']]
+            self.etag = entry.get('etag')
+            self.last_modified = entry.get('last_modified')
+            self.digest = entry.get('sha256')
+            self.shards = list(entry.get('shards', []))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"页面缓存无效，已忽略: {str(e)}")
+            self.services = None
+
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        # 多个页面并发获取时共用一个缓存文件，读改写需要加锁
+        with _cache_lock:
+            cache = self._read_cache_file()
+            cache[self.location] = {
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'sha256': self.digest,
+                'shards': self.shards,
+                'services': [service.to_dict() for service in self.services]
+            }
+            try:
+                atomic_write(self.cache_file, json.dumps(cache, ensure_ascii=False))
+            except OSError as e:
+                logging.error(f"保存页面缓存失败: {str(e)}")
+
+    @property
+    def is_remote(self):
+        return self.location.startswith(('http://', 'https://'))
+
+    def _update(self, content, etag, last_modified):
+        """根据页面内容更新缓存，返回状态"""
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == self.digest and self.services is not None:
+            status = 'unchanged'
+        else:
+            text = content.decode('utf-8', errors='replace')
+            with run_metrics.timed('parse'):
+                self.services = self.parse(text)
+            self.shards = script_locations(text, self.location)
+            self.digest = digest
+            status = 'parsed'
+        if status == 'parsed' or (etag, last_modified) != (self.etag, self.last_modified):
+            self.etag, self.last_modified = etag, last_modified
+            self._save_cache()
+        return status
+
+    def fetch(self):
+        """返回 (服务列表, 状态)：状态为 'not-modified'（304 或文件未修改）、'unchanged'（内容哈希相同）或 'parsed'
+
+        分片模式的页面返回页面和所有分片文件中的服务，任何一部分重新解析过时状态为 'parsed'。
+        请求失败时抛出 requests.RequestException，读取本地文件失败时抛出 OSError，
+        页面引用了分片文件却没有读取到任何服务时抛出 ValueError
+        """
+        services, status = self._fetch_page()
+        if not self.shards:
+            return services, status
+        services = list(services)
+        statuses = {status}
+        for _, shard_services, shard_status in fetch_all([self._shard_source(location) for location in self.shards]):
+            if isinstance(shard_status, Exception):
+                raise shard_status
+            services += shard_services
+            statuses.add(shard_status)
+        check_loaded(len(services), self.shards)
+        for status in ('parsed', 'unchanged'):
+            if status in statuses:
+                return services, status
+        return services, 'not-modified'
+
+    def _shard_source(self, location):
+        source = self._shard_sources.get(location)
+        if source is None:
+            source = DashboardSource(location, self.parse, f"{self.name} {location.rsplit('/', 1)[-1]}",
+                                     self.cache_file)
+            self._shard_sources[location] = source
+        return source
+
+    def _fetch_page(self):
+        if not self.is_remote:
+            st = os.stat(self.location)
+            stamp = f"{st.st_mtime_ns}:{st.st_size}"
+            if stamp == self.etag and self.services is not None:
+                return self.services, 'not-modified'
+            with open(self.location, 'rb') as f:
+                status = self._update(f.read(), stamp, None)
+            return self.services, status
+
+        headers = {'User-Agent': USER_AGENT}
+        if self.services is not None:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+        response = http_client.get(self.location, headers=headers)
+        if response.status_code == 304 and self.services is not None:
+            return self.services, 'not-modified'
+        response.raise_for_status()
+        status = self._update(response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return self.services, status
+
+
+def fetch_all(sources, max_workers=MAX_WORKERS):
+    """并发获取多个页面（同一主机复用连接池），返回 [(source, 服务列表, 状态或异常), ...]，顺序与 sources 相同
+
+    获取失败的页面服务列表为 None
+    """
+    def fetch_one(source):
+        try:
+            services, status = source.fetch()
+            return source, services, status
+        except Exception as e:
+            return source, None, e
+
+    if len(sources) <= 1:
+        return [fetch_one(source) for source in sources]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sources))) as executor:
+        return list(executor.map(fetch_one, sources))
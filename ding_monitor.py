@@ -1,446 +1,182 @@
-<<<<<<< HEAD
+import os
 import time
 import logging
 import json
-import hmac
-import hashlib
-import base64
-import urllib.parse
-from datetime import datetime
-import requests
-import re
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='vps_monitor.log'
-)
+from alert_ledger import AlertLedger
+from dashboard_source import DashboardSource, fetch_all
+from log_setup import setup_logging
+from monitor_daemon import next_alert_day, run_daemon, wake_time
+from run_metrics import METRICS_DIR, RunMetrics, record_error
+from notifier import DingTalkChannel, Notification, NotificationDispatcher, channels_from_config
+from vps_parser import iter_vps_services, JSParseError, VPSServicesNotFound
+from vps_billing import monthly_due
+from vps_record import DueIndex, VPSRecord, today_ordinal
+from vps_shards import ShardEvaluator
 
 # 配置
 VPS_PAGE_URL = "https://woniu336.github.io/vps-date/"  # 替换为你的实际URL
+# 同时监控多个页面时填写（URL 或本地文件路径，可写成 "名称=地址"），填写后忽略 VPS_PAGE_URL；
+# config.json 中的 "dashboards" 也会加入监控
+VPS_PAGES = []
 DINGTALK_WEBHOOK = ""
 DINGTALK_SECRET = ""
+# 钉钉API地址，留空使用官方地址（也可以用环境变量 VPS_DINGTALK_API 指向本地替身做压测）
+DINGTALK_API_BASE = ""
+# 如果存在 config.json（与 vps_manager.py 共用），其中启用的 Telegram/钉钉/Webhook 也会收到警报
+CONFIG_FILE = "config.json"
+# 剩余天数不超过2天（含已过期）时提醒
+ALERT_MAX_DAYS = 2
+# 远程页面的刷新间隔：即使没有到期提醒，也至少每隔这么久检查一次页面是否修改（条件请求，未修改时几乎没有流量）
+REFRESH_INTERVAL = 60 * 60
 
 def calculate_days_until_expire(service):
     """计算距离到期还有多少天"""
-    today = datetime.now()
+    days_left = service.days_left(today_ordinal())
+    if days_left is not None:
+        # 具体到期日期（nextDueDate，兼容旧格式 expireDate），加载时已解析
+        return days_left
     
-    if 'expireDate' in service:
-        # 处理具体到期日期
-        expire_date = datetime.strptime(service['expireDate'], '%Y-%m-%d')
-        days_left = (expire_date - today).days
-    elif 'monthlyExpireDay' in service:
-        # 处理每月重复日期
-        expire_day = service['monthlyExpireDay']
-        next_expire = datetime(today.year, today.month, expire_day)
-        
-        if today.day > expire_day:
-            if today.month == 12:
-                next_expire = datetime(today.year + 1, 1, expire_day)
-            else:
-                next_expire = datetime(today.year, today.month + 1, expire_day)
-        
-        days_left = (next_expire - today).days
-    else:
-        return None
+    if service.monthly_day is not None:
+        # 处理每月重复日期（跨年、小月按月末处理）
+        today_ord = today_ordinal()
+        return monthly_due(service.monthly_day, today_ord) - today_ord
     
-    return days_left
+    return None
 
-def sign_dingtalk_webhook():
-    """为钉钉消息签名"""
-    timestamp = str(round(time.time() * 1000))
-    secret_enc = DINGTALK_SECRET.encode('utf-8')
-    string_to_sign = '{}\n{}'.format(timestamp, DINGTALK_SECRET)
-    string_to_sign_enc = string_to_sign.encode('utf-8')
-    hmac_code = hmac.new(secret_enc, string_to_sign_enc, digestmod=hashlib.sha256).digest()
-    sign = urllib.parse.quote_plus(base64.b64encode(hmac_code))
-    return f"{DINGTALK_WEBHOOK}&timestamp={timestamp}&sign={sign}"
+def load_config():
+    if not os.path.exists(CONFIG_FILE):
+        return {}
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error(f"读取 {CONFIG_FILE} 失败: {str(e)}")
+        return {}
+
+def build_channels():
+    """钉钉（本文件中的配置）加上 config.json 中已启用的其他通道"""
+    channels = []
+    if DINGTALK_WEBHOOK:
+        channels.append(DingTalkChannel(DINGTALK_WEBHOOK, DINGTALK_SECRET, DINGTALK_API_BASE or None))
+    channels.extend(channels_from_config(load_config()))
+    return channels
 
 def send_dingtalk_alert(expiring_services):
-    """发送钉钉警报"""
+    """发送到期警报（钉钉及其他已启用的通道），至少一个通道发送成功时返回 True"""
     if not expiring_services:
-        return
+        return False
     
     message = "# VPS服务到期提醒\n\n"
     message += "> 以下服务即将在2天内到期，请注意续费！\n\n"
     
-    for service in expiring_services:
+    for service, days_left, source in expiring_services:
         message += "---\n"  # 添加分隔线
-        message += f"### {service['name']}\n"
-        message += f"💰 费用：`{service['cost']} {service['currency']}`\n"
-        message += f"⏰ 剩余：<font color='red'>{service['days_left']}天</font>\n\n"
+        message += f"### {service.name}\n"
+        if source:
+            message += f"📄 来源：{source}\n"
+        message += f"💰 费用：`{service.cost} {service.currency}`\n"
+        message += f"⏰ 剩余：<font color='red'>{days_left}天</font>\n\n"
     
     message += "\n> 💡 请及时处理，以免服务中断\n\n"
     message += f"---\n[查看详情]({VPS_PAGE_URL})"  # 添加链接
     
-    data = {
-        "msgtype": "markdown",
-        "markdown": {
-            "title": "VPS到期提醒",
-            "text": message
-        }
-    }
+    text = "VPS服务到期提醒\n以下服务即将在2天内到期，请注意续费！\n\n"
+    text += "\n".join(
+        f"<b>{service.name}</b>{f' [{source}]' if source else ''}: {service.cost} {service.currency}，剩余 {days_left} 天"
+        for service, days_left, source in expiring_services
+    )
     
-    headers = {
-        'Content-Type': 'application/json; charset=utf-8',
-        'Accept': 'application/json'
-    }
-    webhook_url = sign_dingtalk_webhook()
-    
-    try:
-        json_data = json.dumps(data, ensure_ascii=False)
-        response = requests.post(webhook_url, headers=headers, data=json_data.encode('utf-8'))
-        if response.status_code == 200:
-            logging.info("钉钉警报发送成功")
-            print("钉钉警报发送成功")
+    # 所有通道并发发送，总耗时取决于最慢的通道
+    results = NotificationDispatcher(build_channels()).send(
+        Notification(text, title="VPS到期提醒", markdown=message)
+    )
+    if not results:
+        print("未配置任何通知通道")
+    for channel, _, error in results:
+        if error is None:
+            logging.info(f"{channel.name}警报发送成功")
+            print(f"{channel.name}警报发送成功")
         else:
-            error_msg = f"钉钉警报发送失败: {response.text}"
+            error_msg = f"发送{channel.name}警报时发生错误: {str(error)}"
+            record_error(f'notify:{channel.name}')
             logging.error(error_msg)
             print(error_msg)
-    except Exception as e:
-        error_msg = f"发送钉钉警报时发生错误: {str(e)}"
-        logging.error(error_msg)
-        print(error_msg)
-
-def get_html_content():
-    """获取HTML内容"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept-Charset': 'UTF-8'
-        }
-        response = requests.get(VPS_PAGE_URL, headers=headers)
-        response.encoding = 'utf-8'
-        content = response.text
-        print("✓ 成功获取页面内容")
-        return content
-    except requests.exceptions.RequestException as e:
-        error_msg = f"获取页面内容失败: {str(e)}"
-        logging.error(error_msg)
-        print(f"✗ {error_msg}")
-        return None
+    return any(error is None for _, _, error in results)
 
-def extract_vps_services(html_content):
-    """从HTML文件中提取VPS服务配置"""
-    try:
-        pattern = r'const\s+vpsServices\s*=\s*(\[\s*{[\s\S]*?\}\s*\]);'
-        match = re.search(pattern, html_content)
-        
-        if not match:
-            logging.error("HTML内容中未找到VPS服务配置")
-            print("✗ HTML内容中未找到VPS服务配置")
-            print("HTML内容预览:", html_content[:200])
-            return []
-        
-        js_array = match.group(1)
-        
-        # 1. 移除注释行
-        py_array = re.sub(r'//.*?\n', '\n', js_array)
-        
-        # 2. 处理单引号为双引号
-        py_array = py_array.replace("'", '"')
-        
-        # 3. 处理没有引号的属性名
-        py_array = re.sub(r'([{,]\s*)(\w+):', r'\1"\2":', py_array)
-        
-        # 4. 分割并处理每个对象
-        # 使用更精确的正则表达式来分割对象
-        objects = re.findall(r'{[^{]*?}(?=\s*[,\]])', py_array)
-        processed_objects = []
-        
-        for obj in objects:
-            # 创建一个新的字典来存储清理后的数据
-            try:
-                # 移除URL字段和其他不需要的字段
-                obj_dict = {}
-                # 提取必要的字段
-                name_match = re.search(r'"name"\s*:\s*"([^"]+)"', obj)
-                cost_match = re.search(r'"cost"\s*:\s*([0-9.]+)', obj)
-                currency_match = re.search(r'"currency"\s*:\s*"([^"]+)"', obj)
-                color_match = re.search(r'"color"\s*:\s*"([^"]+)"', obj)
-                
-                # 检查过期日期
-                expire_date_match = re.search(r'"expireDate"\s*:\s*"([^"]+)"', obj)
-                monthly_expire_match = re.search(r'"monthlyExpireDay"\s*:\s*([0-9]+)', obj)
-                
-                if name_match and cost_match and currency_match:
-                    obj_dict["name"] = name_match.group(1)
-                    obj_dict["cost"] = float(cost_match.group(1))
-                    obj_dict["currency"] = currency_match.group(1)
-                    if color_match:
-                        obj_dict["color"] = color_match.group(1)
-                    if expire_date_match:
-                        obj_dict["expireDate"] = expire_date_match.group(1)
-                    if monthly_expire_match:
-                        obj_dict["monthlyExpireDay"] = int(monthly_expire_match.group(1))
-                    
-                    processed_objects.append(obj_dict)
-            except Exception as e:
-                print(f"处理对象时出错: {str(e)}, 跳过此对象")
-                continue
-        
-        # 5. 转换为JSON字符串
-        py_array = json.dumps(processed_objects, ensure_ascii=False)
-        
-        try:
-            services = json.loads(py_array)
-            print(f"✓ 成功读取 {len(services)} 个VPS配置")
-            return services
-        except json.JSONDecodeError as je:
-            logging.error(f"JSON解析错误: {str(je)}")
-            print(f"✗ JSON解析错误: {str(je)}")
-            print(f"错误位置: 行 {je.lineno}, 列 {je.colno}")
-            print(f"具体字符: {je.doc[max(0, je.pos-20):je.pos+20]}")
-            return []
-            
-    except Exception as e:
-        error_msg = f"配置读取失败: {str(e)}"
-        logging.error(error_msg)
-        print(f"✗ {error_msg}")
-        return []
+_page_sources = {}
+# 各页面上一次的到期计算结果：页面（包括分片）未修改时沿用缓存的记录对象，不需要重新计算
+_evaluator = ShardEvaluator()
 
-def check_vps_expiration():
-    """检查VPS到期情况"""
-    try:
-        html_content = get_html_content()
-        if not html_content:
-            return
-        
-        services = extract_vps_services(html_content)
-        expiring_services = []
-        
-        for service in services:
-            days_left = calculate_days_until_expire(service)
-            if days_left is not None and days_left <= 2:
-                service['days_left'] = days_left
-                expiring_services.append(service)
-                print(f"⚠️ {service['name']} 将在 {days_left} 天后到期")
-        
-        if expiring_services:
-            send_dingtalk_alert(expiring_services)
+def dashboard_sources():
+    """要监控的页面 [(名称, 地址), ...]"""
+    pages = []
+    for entry in list(VPS_PAGES or [VPS_PAGE_URL]) + list(load_config().get('dashboards', [])):
+        if isinstance(entry, dict):
+            pages.append((entry.get('name') or entry['url'], entry['url']))
+        elif '=' in entry and not entry.startswith(('http://', 'https://')):
+            name, location = entry.split('=', 1)
+            pages.append((name.strip(), location.strip()))
         else:
-            print("✓ 所有服务运行正常")
-            
-    except Exception as e:
-        error_msg = f"检查失败: {str(e)}"
-        logging.error(error_msg)
-        print(f"✗ {error_msg}")
+            pages.append((entry, entry))
+    # 去掉重复的地址
+    return list({location: (name, location) for name, location in reversed(pages)}.values())[::-1]
 
-def main():
-    """主函数"""
-    print("VPS监控服务已启动")
-    logging.info("VPS监控服务启动")
-    
-    while True:
-        try:
-            check_vps_expiration()
-            print("\n>>> 等待6小时后进行下一次检查...\n")
-            time.sleep(6 * 60 * 60)
-        except Exception as e:
-            error_msg = f"运行时错误: {str(e)}"
-            logging.error(error_msg)
-            print(f"✗ {error_msg}")
-            print(">>> 5分钟后重试...")
-            time.sleep(300)
+def get_vps_services():
+    """并发获取所有页面中的VPS服务，返回 [(页面名称, 服务列表), ...]；全部失败时返回 None
 
-if __name__ == "__main__":
-=======
-import time
-import logging
-import json
-import hmac
-import hashlib
-import base64
-import urllib.parse
-from datetime import datetime
-import requests
-import re
+    页面未修改（304 或内容相同）时直接使用上次的解析结果
+    """
+    sources = []
+    for name, location in dashboard_sources():
+        source = _page_sources.get(location)
+        if source is None:
+            source = _page_sources[location] = DashboardSource(location, extract_vps_services, name)
+        source.name = name
+        sources.append(source)
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='vps_monitor.log'
-)
-
-# 配置
-VPS_PAGE_URL = "https://woniu336.github.io/vps-date/"  # 替换为你的实际URL
-DINGTALK_WEBHOOK = ""
-DINGTALK_SECRET = ""
-
-def calculate_days_until_expire(service):
-    """计算距离到期还有多少天"""
-    today = datetime.now()
-    
-    if 'expireDate' in service:
-        # 处理具体到期日期
-        expire_date = datetime.strptime(service['expireDate'], '%Y-%m-%d')
-        days_left = (expire_date - today).days
-    elif 'monthlyExpireDay' in service:
-        # 处理每月重复日期
-        expire_day = service['monthlyExpireDay']
-        next_expire = datetime(today.year, today.month, expire_day)
-        
-        if today.day > expire_day:
-            if today.month == 12:
-                next_expire = datetime(today.year + 1, 1, expire_day)
-            else:
-                next_expire = datetime(today.year, today.month + 1, expire_day)
-        
-        days_left = (next_expire - today).days
-    else:
-        return None
-    
-    return days_left
-
-def sign_dingtalk_webhook():
-    """为钉钉消息签名"""
-    timestamp = str(round(time.time() * 1000))
-    secret_enc = DINGTALK_SECRET.encode('utf-8')
-    string_to_sign = '{}\n{}'.format(timestamp, DINGTALK_SECRET)
-    string_to_sign_enc = string_to_sign.encode('utf-8')
-    hmac_code = hmac.new(secret_enc, string_to_sign_enc, digestmod=hashlib.sha256).digest()
-    sign = urllib.parse.quote_plus(base64.b64encode(hmac_code))
-    return f"{DINGTALK_WEBHOOK}&timestamp={timestamp}&sign={sign}"
-
-def send_dingtalk_alert(expiring_services):
-    """发送钉钉警报"""
-    if not expiring_services:
-        return
-    
-    message = "# VPS服务到期提醒\n\n"
-    message += "> 以下服务即将在2天内到期，请注意续费！\n\n"
-    
-    for service in expiring_services:
-        message += "---\n"  # 添加分隔线
-        message += f"### {service['name']}\n"
-        message += f"💰 费用：`{service['cost']} {service['currency']}`\n"
-        message += f"⏰ 剩余：<font color='red'>{service['days_left']}天</font>\n\n"
-    
-    message += "\n> 💡 请及时处理，以免服务中断\n\n"
-    message += f"---\n[查看详情]({VPS_PAGE_URL})"  # 添加链接
-    
-    data = {
-        "msgtype": "markdown",
-        "markdown": {
-            "title": "VPS到期提醒",
-            "text": message
-        }
-    }
-    
-    headers = {
-        'Content-Type': 'application/json; charset=utf-8',
-        'Accept': 'application/json'
-    }
-    webhook_url = sign_dingtalk_webhook()
-    
-    try:
-        json_data = json.dumps(data, ensure_ascii=False)
-        response = requests.post(webhook_url, headers=headers, data=json_data.encode('utf-8'))
-        if response.status_code == 200:
-            logging.info("钉钉警报发送成功")
-            print("钉钉警报发送成功")
-        else:
-            error_msg = f"钉钉警报发送失败: {response.text}"
+    results = []
+    for source, services, status in fetch_all(sources):
+        if services is None:
+            error_msg = f"获取页面 {source.name} 失败: {str(status)}"
+            record_error(f'fetch:{source.name}')
             logging.error(error_msg)
-            print(error_msg)
-    except Exception as e:
-        error_msg = f"发送钉钉警报时发生错误: {str(e)}"
-        logging.error(error_msg)
-        print(error_msg)
-
-def get_html_content():
-    """获取HTML内容"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept-Charset': 'UTF-8'
-        }
-        response = requests.get(VPS_PAGE_URL, headers=headers)
-        response.encoding = 'utf-8'
-        content = response.text
-        print("✓ 成功获取页面内容")
-        return content
-    except requests.exceptions.RequestException as e:
-        error_msg = f"获取页面内容失败: {str(e)}"
-        logging.error(error_msg)
-        print(f"✗ {error_msg}")
-        return None
+            print(f"✗ {error_msg}")
+            continue
+        print({
+            'not-modified': f"✓ {source.name} 未修改，使用缓存的服务列表",
+            'unchanged': f"✓ {source.name} 内容未变化，使用缓存的服务列表",
+            'parsed': f"✓ 成功获取页面内容: {source.name}"
+        }[status])
+        results.append((source.name, services))
+    return results or None
 
 def extract_vps_services(html_content):
-    """从HTML文件中提取VPS服务配置"""
+    """从HTML文件中提取VPS服务配置（单遍扫描，逐个读取对象）"""
+    services = []
     try:
-        pattern = r'const\s+vpsServices\s*=\s*(\[\s*{[\s\S]*?\}\s*\]);'
-        match = re.search(pattern, html_content)
-        
-        if not match:
-            logging.error("HTML内容中未找到VPS服务配置")
-            print("✗ HTML内容中未找到VPS服务配置")
-            print("HTML内容预览:", html_content[:200])
-            return []
-        
-        js_array = match.group(1)
-        
-        # 1. 移除注释行
-        py_array = re.sub(r'//.*?\n', '\n', js_array)
-        
-        # 2. 处理单引号为双引号
-        py_array = py_array.replace("'", '"')
-        
-        # 3. 处理没有引号的属性名
-        py_array = re.sub(r'([{,]\s*)(\w+):', r'\1"\2":', py_array)
-        
-        # 4. 分割并处理每个对象
-        # 使用更精确的正则表达式来分割对象
-        objects = re.findall(r'{[^{]*?}(?=\s*[,\]])', py_array)
-        processed_objects = []
-        
-        for obj in objects:
-            # 创建一个新的字典来存储清理后的数据
+        for obj in iter_vps_services(html_content):
+            if not isinstance(obj, dict):
+                continue
+            if not all(key in obj for key in ('name', 'cost', 'currency')):
+                print(f"缺少必要字段, 跳过此对象: {obj.get('name', obj)}")
+                continue
             try:
-                # 移除URL字段和其他不需要的字段
-                obj_dict = {}
-                # 提取必要的字段
-                name_match = re.search(r'"name"\s*:\s*"([^"]+)"', obj)
-                cost_match = re.search(r'"cost"\s*:\s*([0-9.]+)', obj)
-                currency_match = re.search(r'"currency"\s*:\s*"([^"]+)"', obj)
-                color_match = re.search(r'"color"\s*:\s*"([^"]+)"', obj)
-                
-                # 检查过期日期
-                expire_date_match = re.search(r'"expireDate"\s*:\s*"([^"]+)"', obj)
-                monthly_expire_match = re.search(r'"monthlyExpireDay"\s*:\s*([0-9]+)', obj)
-                
-                if name_match and cost_match and currency_match:
-                    obj_dict["name"] = name_match.group(1)
-                    obj_dict["cost"] = float(cost_match.group(1))
-                    obj_dict["currency"] = currency_match.group(1)
-                    if color_match:
-                        obj_dict["color"] = color_match.group(1)
-                    if expire_date_match:
-                        obj_dict["expireDate"] = expire_date_match.group(1)
-                    if monthly_expire_match:
-                        obj_dict["monthlyExpireDay"] = int(monthly_expire_match.group(1))
-                    
-                    processed_objects.append(obj_dict)
-            except Exception as e:
+                services.append(VPSRecord.from_dict(obj))
+            except (TypeError, ValueError) as e:
                 print(f"处理对象时出错: {str(e)}, 跳过此对象")
-                continue
-        
-        # 5. 转换为JSON字符串
-        py_array = json.dumps(processed_objects, ensure_ascii=False)
         
-        try:
-            services = json.loads(py_array)
-            print(f"✓ 成功读取 {len(services)} 个VPS配置")
-            return services
-        except json.JSONDecodeError as je:
-            logging.error(f"JSON解析错误: {str(je)}")
-            print(f"✗ JSON解析错误: {str(je)}")
-            print(f"错误位置: 行 {je.lineno}, 列 {je.colno}")
-            print(f"具体字符: {je.doc[max(0, je.pos-20):je.pos+20]}")
-            return []
-            
+        print(f"✓ 成功读取 {len(services)} 个VPS配置")
+        return services
+    
+    except VPSServicesNotFound:
+        logging.error("HTML内容中未找到VPS服务配置")
+        print("✗ HTML内容中未找到VPS服务配置")
+        print("HTML内容预览:", html_content[:200])
+        return []
+    except JSParseError as e:
+        logging.error(f"配置解析错误: {str(e)}")
+        print(f"✗ 配置解析错误: {str(e)}")
+        return []
     except Exception as e:
         error_msg = f"配置读取失败: {str(e)}"
         logging.error(error_msg)
@@ -448,49 +184,91 @@ def extract_vps_services(html_content):
         return []
 
 def check_vps_expiration():
-    """检查VPS到期情况"""
+    """检查所有页面的VPS到期情况，返回读取到的全部服务（所有页面都获取失败时返回 None）
+
+    各阶段耗时、扫描和提醒数量、HTTP请求写入 metrics/ding_monitor.prom 和 metrics/ding_monitor.jsonl
+    """
+    metrics = RunMetrics('ding_monitor', load_config().get('metrics_dir', METRICS_DIR)).start()
     try:
-        html_content = get_html_content()
-        if not html_content:
-            return
+        metrics.begin('fetch')
+        pages = get_vps_services()
+        if pages is None:
+            return None
         
-        services = extract_vps_services(html_content)
-        expiring_services = []
+        metrics.begin('evaluate')
+        metrics.set('pages', len(pages))
+        today_ord = today_ordinal()
+        # 监控多个页面时，警报中注明来自哪个页面
+        multiple = len(pages) > 1
+        all_services = []
+        # 有具体到期日的服务按页面整批计算（只重新计算有变化的页面），旧的每月续费日逐个计算
+        # 页面名称可能重复，按 (序号, 名称) 区分
+        shards = {(i, page): services for i, (page, services) in enumerate(pages)}
+        expiring, _, _ = _evaluator.evaluate(shards, today_ord, max_days=ALERT_MAX_DAYS)
+        metrics.set('pages_evaluated', _evaluator.evaluated)
+        expiring_services = [
+            (service, days_left, key[1] if multiple else None) for service, days_left, key in expiring
+        ]
+        for page, services in pages:
+            all_services.extend(services)
+            source = page if multiple else None
+            for service in services:
+                if service.due is None:
+                    days_left = calculate_days_until_expire(service)
+                    if days_left is not None and days_left <= ALERT_MAX_DAYS:
+                        expiring_services.append((service, days_left, source))
         
-        for service in services:
-            days_left = calculate_days_until_expire(service)
-            if days_left is not None and days_left <= 2:
-                service['days_left'] = days_left
-                expiring_services.append(service)
-                print(f"⚠️ {service['name']} 将在 {days_left} 天后到期")
+        metrics.set('records_scanned', len(all_services))
+        for service, days_left, source in expiring_services:
+            print(f"⚠️ {service.name}{f' [{source}]' if source else ''} 将在 {days_left} 天后到期")
         
-        if expiring_services:
-            send_dingtalk_alert(expiring_services)
+        # 已经发送过的警报（同一到期日、同一剩余天数）不再重复发送
+        ledger = AlertLedger(scope='dingtalk')
+        new_alerts = ledger.unsent(expiring_services, today_ord)
+        metrics.set('alerts_due', len(expiring_services))
+        metrics.set('alerts_new', len(new_alerts))
+        metrics.set('alerts_sent', 0)
+        if new_alerts:
+            metrics.begin('notify')
+            if send_dingtalk_alert(new_alerts):
+                ledger.mark(new_alerts, today_ord)
+                metrics.set('alerts_sent', len(new_alerts))
+        elif expiring_services:
+            print("✓ 到期警报均已发送过")
         else:
             print("✓ 所有服务运行正常")
+        ledger.save(today_ord)
+        return all_services
             
     except Exception as e:
+        metrics.fail()
         error_msg = f"检查失败: {str(e)}"
         logging.error(error_msg)
         print(f"✗ {error_msg}")
+        return None
+    finally:
+        metrics.finish().write()
 
 def main():
-    """主函数"""
+    """主函数：休眠到下一次有新提醒的日期，并按 REFRESH_INTERVAL 定期刷新页面"""
     print("VPS监控服务已启动")
     logging.info("VPS监控服务启动")
-    
-    while True:
-        try:
-            check_vps_expiration()
-            print("\n>>> 等待6小时后进行下一次检查...\n")
-            time.sleep(6 * 60 * 60)
-        except Exception as e:
-            error_msg = f"运行时错误: {str(e)}"
-            logging.error(error_msg)
-            print(f"✗ {error_msg}")
+    state = {}
+
+    def check():
+        state['services'] = check_vps_expiration()
+
+    def next_wake():
+        services = state.get('services')
+        if services is None:
             print(">>> 5分钟后重试...")
-            time.sleep(300)
+            return time.time() + 300
+        day = next_alert_day(DueIndex(services), today_ordinal() + 1, ALERT_MAX_DAYS)
+        return wake_time(day) if day is not None else None
+
+    run_daemon(check, next_wake, max_sleep=REFRESH_INTERVAL)
 
 if __name__ == "__main__":
->>>>>>> c744c3255698883eaa9fb21fc1d27f29bcd099bf
+    # 日志写入 logs/ding_monitor.log（JSON Lines，后台线程写入，自动轮转）
+    setup_logging('ding_monitor', load_config().get('logging') or {})
     main() 
\ No newline at end of file
@@ -1,190 +1,3 @@
 // 汇率数据 - 相对于人民币(CNY) - 更新时间: 2025-09-12 09:11:26
-const exchangeRates = {
-    "CNY": 1,
-    "AED": 0.516,
-    "AFN": 9.58,
-    "ALL": 11.66,
-    "AMD": 53.74,
-    "ANG": 0.251,
-    "AOA": 130.94,
-    "ARS": 200.55,
-    "AUD": 0.213,
-    "AWG": 0.251,
-    "AZN": 0.239,
-    "BAM": 0.234,
-    "BBD": 0.281,
-    "BDT": 17.1,
-    "BGN": 0.234,
-    "BHD": 0.0528,
-    "BIF": 419.77,
-    "BMD": 0.14,
-    "BND": 0.18,
-    "BOB": 0.972,
-    "BRL": 0.759,
-    "BSD": 0.14,
-    "BTN": 12.41,
-    "BWP": 1.91,
-    "BYN": 0.457,
-    "BZD": 0.281,
-    "CAD": 0.195,
-    "CDF": 407.78,
-    "CHF": 0.112,
-    "CLP": 135.14,
-    "COP": 550.14,
-    "CRC": 70.84,
-    "CUP": 3.37,
-    "CVE": 13.22,
-    "CZK": 2.92,
-    "DJF": 24.97,
-    "DKK": 0.894,
-    "DOP": 8.95,
-    "DZD": 18.24,
-    "EGP": 6.77,
-    "ERN": 2.11,
-    "ETB": 20.17,
-    "EUR": 0.12,
-    "FJD": 0.315,
-    "FKP": 0.104,
-    "FOK": 0.894,
-    "GBP": 0.104,
-    "GEL": 0.378,
-    "GGP": 0.104,
-    "GHS": 1.78,
-    "GIP": 0.104,
-    "GMD": 10.3,
-    "GNF": 1220.78,
-    "GTQ": 1.08,
-    "GYD": 29.39,
-    "HKD": 1.09,
-    "HNL": 3.68,
-    "HRK": 0.903,
-    "HTG": 18.39,
-    "HUF": 47.04,
-    "IDR": 2313.66,
-    "ILS": 0.468,
-    "IMP": 0.104,
-    "INR": 12.41,
-    "IQD": 183.76,
-    "IRR": 5990.93,
-    "ISK": 17.17,
-    "JEP": 0.104,
-    "JMD": 22.48,
-    "JOD": 0.0996,
-    "JPY": 20.71,
-    "KES": 18.15,
-    "KGS": 12.26,
-    "KHR": 563.38,
-    "KID": 0.213,
-    "KMF": 58.96,
-    "KRW": 195.37,
-    "KWD": 0.0425,
-    "KYD": 0.117,
-    "KZT": 75.71,
-    "LAK": 3045.87,
-    "LBP": 12572.88,
-    "LKR": 42.4,
-    "LRD": 26.34,
-    "LSL": 2.45,
-    "LYD": 0.759,
-    "MAD": 1.27,
-    "MDL": 2.33,
-    "MGA": 620.54,
-    "MKD": 7.38,
-    "MMK": 294.92,
-    "MNT": 501.51,
-    "MOP": 1.13,
-    "MRU": 5.61,
-    "MUR": 6.41,
-    "MVR": 2.17,
-    "MWK": 244.85,
-    "MXN": 2.61,
-    "MYR": 0.592,
-    "MZN": 8.98,
-    "NAD": 2.45,
-    "NGN": 211.72,
-    "NIO": 5.17,
-    "NOK": 1.39,
-    "NPR": 19.86,
-    "NZD": 0.236,
-    "OMR": 0.054,
-    "PAB": 0.14,
-    "PEN": 0.489,
-    "PGK": 0.594,
-    "PHP": 8.03,
-    "PKR": 39.87,
-    "PLN": 0.511,
-    "PYG": 1002.64,
-    "QAR": 0.511,
-    "RON": 0.609,
-    "RSD": 14.07,
-    "RUB": 11.9,
-    "RWF": 204.27,
-    "SAR": 0.527,
-    "SBD": 1.18,
-    "SCR": 2.1,
-    "SDG": 62.78,
-    "SEK": 1.31,
-    "SGD": 0.18,
-    "SHP": 0.104,
-    "SLE": 3.28,
-    "SLL": 3276.84,
-    "SOS": 80.33,
-    "SRD": 5.53,
-    "SSP": 660.79,
-    "STN": 2.94,
-    "SYP": 1838.21,
-    "SZL": 2.45,
-    "THB": 4.46,
-    "TJS": 1.34,
-    "TMT": 0.491,
-    "TND": 0.405,
-    "TOP": 0.338,
-    "TRY": 5.81,
-    "TTD": 0.953,
-    "TVD": 0.213,
-    "TWD": 4.26,
-    "TZS": 346.11,
-    "UAH": 5.8,
-    "UGX": 492.47,
-    "USD": 0.14,
-    "UYU": 5.61,
-    "UZS": 1727.06,
-    "VES": 22.31,
-    "VND": 3695.1,
-    "VUV": 16.8,
-    "WST": 0.383,
-    "XAF": 78.62,
-    "XCD": 0.379,
-    "XCG": 0.251,
-    "XDR": 0.103,
-    "XOF": 78.62,
-    "XPF": 14.3,
-    "YER": 33.64,
-    "ZAR": 2.45,
-    "ZMW": 3.37,
-    "ZWL": 3.76
-};
-
-// 币种中文名称映射
-const currencyNames = {
-    "USD": "美元",
-    "EUR": "欧元",
-    "CNY": "人民币",
-    "CAD": "加元",
-    "HKD": "港币",
-    "JPY": "日元",
-    "GBP": "英镑",
-    "AUD": "澳元",
-    "SGD": "新加坡元",
-    "KRW": "韩元",
-    "TWD": "新台币",
-    "RUB": "俄罗斯卢布",
-    "CHF": "瑞士法郎",
-    "SEK": "瑞典克朗",
-    "NOK": "挪威克朗",
-    "DKK": "丹麦克朗",
-    "THB": "泰铢",
-    "MYR": "马来西亚林吉特",
-    "INR": "印度卢比",
-    "BRL": "巴西雷亚尔"
-};
+const exchangeRates={"AUD":0.213,"BRL":0.759,"CAD":0.195,"CHF":0.112,"CNY":1,"DKK":0.894,"EUR":0.12,"GBP":0.104,"HKD":1.09,"INR":12.41,"JPY":20.71,"KRW":195.37,"MYR":0.592,"NOK":1.39,"RUB":11.9,"SEK":1.31,"SGD":0.18,"THB":4.46,"TWD":4.26,"USD":0.14};
+const currencyNames={"AUD":"澳元","BRL":"巴西雷亚尔","CAD":"加元","CHF":"瑞士法郎","CNY":"人民币","DKK":"丹麦克朗","EUR":"欧元","GBP":"英镑","HKD":"港币","INR":"印度卢比","JPY":"日元","KRW":"韩元","MYR":"马来西亚林吉特","NOK":"挪威克朗","RUB":"俄罗斯卢布","SEK":"瑞典克朗","SGD":"新加坡元","THB":"泰铢","TWD":"新台币","USD":"美元"};
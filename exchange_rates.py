@@ -0,0 +1,287 @@
+import gzip
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import http_client
+from vps_store import atomic_write
+
+# 免费API每天只更新一次，默认12小时内直接使用缓存
+DEFAULT_TTL = 12 * 60 * 60
+# 同时请求所有数据源，最多等待的秒数
+RACE_TIMEOUT = 20
+# 用来互相校验的主要币种，以及允许的偏差
+CHECK_CURRENCIES = ('USD', 'EUR', 'HKD', 'JPY', 'GBP')
+TOLERANCE = 0.05
+
+
+class RateResponse:
+    def __init__(self, rates, etag=None, last_modified=None, not_modified=False):
+        self.rates = rates
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+
+class RateProvider:
+    """汇率数据源：fetch 返回以 base 为基准、币种代码大写的 RateResponse，失败时抛出异常"""
+    name = 'provider'
+
+    def fetch(self, base, validators=None):
+        raise NotImplementedError
+
+
+class JSONRateProvider(RateProvider):
+    """返回JSON的汇率API；url 中的 {base} / {base_lower} 会被替换，extract 从响应中取出汇率字典"""
+
+    def __init__(self, name, url, extract=lambda data, base: data['rates']):
+        self.name = name
+        self.url = url
+        self.extract = extract
+
+    def fetch(self, base, validators=None):
+        headers = {}
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        url = self.url.format(base=base, base_lower=base.lower())
+        # 多个数据源互为备份，单个数据源失败不再重试
+        response = http_client.get(url, headers=headers, retries=0)
+        if response.status_code == 304:
+            return RateResponse(None, not_modified=True)
+        response.raise_for_status()
+        return RateResponse(
+            normalize(self.extract(response.json(), base), base),
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified')
+        )
+
+
+class FileRateProvider(RateProvider):
+    """本地JSON文件：{"rates": {...}} 或直接是汇率字典，基准币种需与 base 相同"""
+
+    def __init__(self, path):
+        self.name = path
+        self.path = path
+
+    def fetch(self, base, validators=None):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data.get('rates'), dict):
+            if data.get('base', base).upper() != base:
+                raise ValueError(f"基准币种不是 {base}")
+            data = data['rates']
+        return RateResponse(normalize(data, base))
+
+
+DEFAULT_PROVIDERS = {
+    'exchangerate-api': lambda: JSONRateProvider(
+        'exchangerate-api', 'https://api.exchangerate-api.com/v4/latest/{base}'),
+    'open-er-api': lambda: JSONRateProvider(
+        'open-er-api', 'https://open.er-api.com/v6/latest/{base}'),
+    'currency-api': lambda: JSONRateProvider(
+        'currency-api',
+        'https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/{base_lower}.json',
+        lambda data, base: data[base.lower()]),
+    'frankfurter': lambda: JSONRateProvider(
+        'frankfurter', 'https://api.frankfurter.app/latest?from={base}'),
+}
+
+
+def providers_from_config(sources=None, api_base=None):
+    """sources 为数据源列表：内置名称、返回 {"rates": ...} 的URL或本地JSON文件路径；默认使用全部内置数据源
+
+    api_base（或环境变量 VPS_RATES_API）把内置数据源的主机替换为同一个地址，如本地替身
+    """
+    api_base = http_client.api_base('rates', api_base)
+    providers = []
+    for source in sources or DEFAULT_PROVIDERS:
+        if source in DEFAULT_PROVIDERS:
+            provider = DEFAULT_PROVIDERS[source]()
+            provider.url = http_client.rebase(provider.url, api_base)
+            providers.append(provider)
+        elif source.startswith(('http://', 'https://')):
+            providers.append(JSONRateProvider(source, source))
+        else:
+            providers.append(FileRateProvider(source))
+    return providers
+
+
+def normalize(rates, base):
+    """币种代码转为大写、汇率转为 float，并检查数据是否合理"""
+    if not isinstance(rates, dict) or not rates:
+        raise ValueError('响应中没有汇率数据')
+    result = {}
+    for currency, rate in rates.items():
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+            continue
+        rate = float(rate)
+        if not math.isfinite(rate) or rate <= 0:
+            raise ValueError(f"{currency.upper()} 汇率无效: {rate}")
+        result[currency.upper()] = rate
+    base_rate = result.setdefault(base, 1.0)
+    if abs(base_rate - 1) > 1e-6:
+        raise ValueError(f"{base} 对自身的汇率不是 1: {base_rate}")
+    return result
+
+
+def agrees(rates, reference, tolerance=TOLERANCE):
+    """两份汇率在主要币种上的偏差都不超过 tolerance"""
+    common = [c for c in CHECK_CURRENCIES if c in rates and c in reference]
+    return all(abs(rates[c] / reference[c] - 1) <= tolerance for c in common)
+
+
+def race(providers, base, reference=None, validators=None, required=(), timeout=RACE_TIMEOUT):
+    """同时请求所有数据源，返回 (数据源, RateResponse)
+
+    最先返回、且与参考汇率（上次的缓存或其他数据源已返回的结果）一致的结果胜出；
+    没有缓存时（首次运行）至少要有两个数据源的结果一致才采用，不会直接接受最快的一个。
+    缺少 required 中币种的结果不采用。全部返回（或超时）后仍没有一致的结果时，
+    采用第一个有效结果；全部失败时抛出 RuntimeError
+    """
+    validators = validators or {}
+    errors = {}
+    valid = []
+    executor = ThreadPoolExecutor(max_workers=max(len(providers), 1))
+    try:
+        futures = {
+            executor.submit(provider.fetch, base, validators.get(provider.name)): provider
+            for provider in providers
+        }
+        pending = set(futures)
+        deadline = time.monotonic() + timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                provider = futures[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    errors[provider.name] = e
+                    continue
+                if response.not_modified:
+                    if reference is not None:
+                        return provider, response
+                    continue
+                missing = [c for c in required if c not in response.rates]
+                if missing:
+                    errors[provider.name] = ValueError(f"缺少币种: {', '.join(missing)}")
+                    continue
+                references = ([reference] if reference else []) + [r.rates for _, r in valid]
+                if any(agrees(response.rates, r) for r in references):
+                    return provider, response
+                valid.append((provider, response))
+    finally:
+        # 不等待较慢的数据源
+        executor.shutdown(wait=False, cancel_futures=True)
+    if valid:
+        return valid[0]
+    details = '; '.join(f"{name}: {error}" for name, error in errors.items()) or '请求超时'
+    raise RuntimeError(f"所有汇率数据源均失败 ({details})")
+
+
+class RateCache:
+    """汇率缓存：保存在数据存储的 meta 表中，TTL 内不访问API；过期后同时请求多个数据源，
+    对上次成功的数据源使用 ETag/Last-Modified 条件请求"""
+
+    def __init__(self, store, base='CNY', ttl=DEFAULT_TTL, providers=None, required=()):
+        self.store = store
+        self.base = base
+        self.ttl = ttl
+        self.providers = providers or providers_from_config()
+        self.required = required
+        self.meta_key = f'exchange_rates:{base}'
+
+    def cached(self):
+        """{'rates': ..., 'fetched_at': ..., 'provider': ..., 'etag': ..., 'last_modified': ...}，没有缓存时返回 None"""
+        entry = self.store.get_meta(self.meta_key)
+        return entry if entry and entry.get('rates') else None
+
+    def age(self, entry=None):
+        entry = entry or self.cached()
+        return None if entry is None else time.time() - entry['fetched_at']
+
+    def is_fresh(self, entry=None):
+        age = self.age(entry)
+        return age is not None and age < self.ttl
+
+    def get(self, force=False):
+        """返回 (汇率, 来源)：来源为 'cache'（未过期）、'not-modified'（304）或胜出的数据源名称
+
+        所有数据源都失败时退回旧缓存（来源 'stale'），完全没有缓存时抛出异常
+        """
+        entry = self.cached()
+        if entry and not force and self.is_fresh(entry):
+            return entry['rates'], 'cache'
+
+        validators = {}
+        if entry and entry.get('provider'):
+            validators[entry['provider']] = {'etag': entry.get('etag'), 'last_modified': entry.get('last_modified')}
+        try:
+            provider, response = race(
+                self.providers, self.base,
+                reference=entry['rates'] if entry else None,
+                validators=validators, required=self.required
+            )
+        except Exception:
+            if entry:
+                return entry['rates'], 'stale'
+            raise
+
+        if response.not_modified:
+            entry['fetched_at'] = time.time()
+            self.store.set_meta(self.meta_key, entry)
+            return entry['rates'], 'not-modified'
+
+        entry = {
+            'rates': response.rates,
+            'fetched_at': time.time(),
+            'provider': provider.name,
+            'etag': response.etag,
+            'last_modified': response.last_modified
+        }
+        self.store.set_meta(self.meta_key, entry)
+        return entry['rates'], provider.name
+
+
+def rates_js(rates, names, currencies, updated_at, base='CNY'):
+    """生成 exchange_rates.js 的内容：只包含 currencies 中的币种，每个对象一行
+
+    第一行是更新时间注释，比较内容是否变化时会跳过这一行
+    """
+    wanted = set(currencies) | {base}
+    compact = {'separators': (',', ':'), 'ensure_ascii': False, 'sort_keys': True}
+    js_content = f"// 汇率数据 - 相对于人民币({base}) - 更新时间: {updated_at}\n"
+    js_content += f"const exchangeRates={json.dumps({c: r for c, r in rates.items() if c in wanted}, **compact)};\n"
+    js_content += f"const currencyNames={json.dumps({c: n for c, n in names.items() if c in wanted}, **compact)};\n"
+    return js_content
+
+
+def _body(js_content):
+    return js_content.split('\n', 1)[1] if '\n' in js_content else js_content
+
+
+def write_rates_js(path, js_content, compress=False):
+    """内容（除更新时间外）没有变化时不写入，避免无意义的提交；compress 时同时生成 .gz 预压缩文件
+
+    返回是否写入了文件
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            unchanged = _body(f.read()) == _body(js_content)
+    except OSError:
+        unchanged = False
+    gz_path = path + '.gz'
+    if unchanged and (not compress or os.path.exists(gz_path)):
+        return False
+    if not unchanged:
+        atomic_write(path, js_content)
+    if compress:
+        # mtime=0 使相同内容的压缩结果完全相同
+        atomic_write(gz_path, gzip.compress(js_content.encode('utf-8'), compresslevel=9, mtime=0))
+    return True
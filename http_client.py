@@ -0,0 +1,130 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (5, 15)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+MAX_RETRY_AFTER = 60
+POOL_SIZE = 10
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+# 每次请求完成后调用 observer(method, url, status, elapsed, error)，用于统计请求次数和耗时
+_observers = []
+
+
+def add_observer(observer):
+    _observers.append(observer)
+
+
+def remove_observer(observer):
+    try:
+        _observers.remove(observer)
+    except ValueError:
+        pass
+
+
+def _notify(method, url, status, elapsed, error=None):
+    for observer in list(_observers):
+        try:
+            observer(method, url, status, elapsed, error)
+        except Exception:
+            pass
+
+
+def api_base(service, override=None):
+    """外部API的基础地址覆盖：优先使用配置中的值，其次是环境变量 VPS_<SERVICE>_API（如 VPS_TELEGRAM_API），
+
+    都没有时返回 None（使用官方地址）。用于把请求指向本地替身做压测或在CI中离线运行
+    """
+    base = override or os.environ.get(f'VPS_{service.upper()}_API')
+    return base.rstrip('/') if base else None
+
+
+def rebase(url, base):
+    """把 url 的 scheme://host 换成 base（base 可以带路径前缀），base 为空时原样返回"""
+    if not base:
+        return url
+    parts = urlsplit(url)
+    return base.rstrip('/') + urlunsplit(('', '', parts.path, parts.query, parts.fragment))
+
+
+def get_session(url):
+    """按 scheme://host 复用 keep-alive 连接池，避免每次请求重新握手"""
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.mount(key, HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+            _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def retry_after(response):
+    """服务端要求的等待秒数：Telegram 放在 parameters.retry_after，其他服务用 Retry-After 头"""
+    seconds = None
+    try:
+        body = response.json()
+        if isinstance(body, dict):
+            seconds = (body.get('parameters') or {}).get('retry_after')
+    except ValueError:
+        pass
+    if seconds is None:
+        seconds = response.headers.get('Retry-After')
+    try:
+        return min(float(seconds), MAX_RETRY_AFTER) if seconds is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt):
+    return BACKOFF_BASE * (2 ** attempt) * (1 + random.random() / 2)
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES, **kwargs):
+    """带超时的请求；429/5xx 和连接失败时退避重试，返回最后一次的响应"""
+    session = get_session(url)
+    # 读超时时请求可能已经被处理，非幂等的 POST 不重试，避免重复发送通知
+    retry_errors = (requests.ConnectionError, requests.Timeout) if method.upper() == 'GET' \
+        else (requests.ConnectionError,)
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            _notify(method, url, None, time.perf_counter() - start, e)
+            if not isinstance(e, retry_errors) or attempt == retries:
+                raise
+            time.sleep(backoff(attempt))
+            continue
+        _notify(method, url, response.status_code, time.perf_counter() - start)
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            wait = retry_after(response)
+            time.sleep(wait if wait is not None else backoff(attempt))
+            continue
+        return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
@@ -0,0 +1,119 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+
+CONFIG_FILE = 'config.json'
+LOG_DIR = 'logs'
+# 单个日志文件的大小上限和保留的旧文件数量，总大小不超过 MAX_BYTES * (BACKUP_COUNT + 1)
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+# LogRecord 自带的属性，其余的（logging.info(..., extra={...}) 传入的）作为额外字段输出
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志一行JSON（UTF-8）：时间、级别、进程标签、PID、logger、消息，以及 extra 传入的字段"""
+
+    def __init__(self, tag):
+        super().__init__()
+        self.tag = tag
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'process': self.tag,
+            'pid': record.process,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        elif record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """只在调用方线程中合并消息参数和异常堆栈，格式化和写文件都在后台线程中进行"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def load_settings(config_file=CONFIG_FILE):
+    """config.json 中的 "logging" 配置，文件不存在或无效时为空"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            settings = json.load(f).get('logging')
+        return settings if isinstance(settings, dict) else {}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def file_handler(tag, settings):
+    """logs/<tag>.log：设置了 when（如 "midnight"）时按时间轮转，否则按大小轮转"""
+    directory = settings.get('dir') or LOG_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{tag}.log')
+    backup_count = int(settings.get('backup_count', BACKUP_COUNT))
+    if settings.get('when'):
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=settings['when'], backupCount=backup_count, encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=int(settings.get('max_bytes', MAX_BYTES)), backupCount=backup_count, encoding='utf-8')
+
+
+def setup_logging(tag, settings=None):
+    """配置根 logger：日志先放入内存队列，由后台线程写入 logs/<tag>.log（JSON Lines，自动轮转）
+
+    每个程序写自己的文件，不会有两个进程同时轮转同一个文件；tag 同时写在每条日志中。
+    settings 缺省时读取 config.json 的 "logging"（dir、max_bytes、backup_count、when、level）。
+    程序退出时自动把队列中剩余的日志写完
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    settings = load_settings() if settings is None else settings
+    handler = file_handler(tag, settings)
+    handler.setFormatter(JSONFormatter(tag))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(str(settings.get('level', 'INFO')).upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """写完队列中的日志并关闭文件"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,92 @@
+import logging
+import os
+import time
+from datetime import date, datetime, time as day_time
+
+from vps_billing import monthly_due
+
+# 到期提醒的发送时间（本地时间几点）
+ALERT_HOUR = 8
+# 检查本地文件是否被修改的间隔（秒），只调用 os.stat
+POLL_INTERVAL = 5
+
+
+def next_alert_day(index, start, max_days, min_days=None):
+    """start 当天或之后、最早出现新提醒的日期序数（index 为 DueIndex）
+
+    剩余天数在 [min_days, max_days] 之间时提醒（min_days 为 None 表示过期后也每天提醒），
+    每个剩余天数提醒一次，所以进入提醒范围后每天都是新的提醒。没有需要提醒的VPS时返回 None
+    """
+    candidates = []
+    record = index.earliest(None if min_days is None else start + min_days)
+    if record is not None:
+        candidates.append(max(record.due - max_days, start))
+    for record in index.undated:
+        if record.monthly_day is not None:
+            due = monthly_due(record.monthly_day, start + (min_days or 0))
+            candidates.append(max(due - max_days, start))
+    return min(candidates, default=None)
+
+
+def wake_time(day, hour=ALERT_HOUR):
+    """日期序数当天 hour 点的时间戳"""
+    return datetime.combine(date.fromordinal(day), day_time(hour)).timestamp()
+
+
+class FileWatcher:
+    """通过 mtime/大小 判断文件是否被修改"""
+
+    def __init__(self, paths):
+        self.paths = [path for path in paths if path]
+        self.stats = self.snapshot()
+
+    def snapshot(self):
+        stats = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stats.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stats.append(None)
+        return stats
+
+    def changed(self):
+        stats = self.snapshot()
+        if stats != self.stats:
+            self.stats = stats
+            return True
+        return False
+
+
+def run_daemon(check, next_wake, watch_paths=(), poll_interval=POLL_INTERVAL, max_sleep=None):
+    """常驻运行：执行 check 后一直休眠到 next_wake() 返回的时间，期间监视的文件被修改时立即重新检查
+
+    check 出错时记录日志并在 5 分钟后重试；next_wake 返回 None 表示只在文件被修改时才检查；
+    max_sleep 为最长休眠秒数（用于需要定期刷新的远程数据）
+    """
+    watcher = FileWatcher(watch_paths)
+    while True:
+        try:
+            check()
+            wake = next_wake()
+        except Exception as e:
+            logging.error(f"检查出错: {str(e)}")
+            print(f"✗ 检查出错: {str(e)}，5分钟后重试")
+            wake = time.time() + 300
+        if max_sleep is not None:
+            wake = min(wake if wake is not None else float('inf'), time.time() + max_sleep)
+        if wake is None:
+            print(">>> 没有即将到期的VPS，等待数据修改...")
+        else:
+            print(f">>> 下次检查: {datetime.fromtimestamp(wake).strftime('%Y-%m-%d %H:%M:%S')}")
+        # 检查本身可能修改被监视的文件（如重新导入 index.html），以检查后的状态为准
+        watcher.changed()
+        while wake is None or time.time() < wake:
+            remaining = poll_interval if wake is None else min(poll_interval, wake - time.time())
+            if not watcher.paths and wake is not None:
+                remaining = wake - time.time()
+            time.sleep(max(remaining, 0))
+            if watcher.paths and watcher.changed():
+                print(">>> 检测到数据修改，重新检查")
+                logging.info("检测到数据修改，重新检查")
+                break
@@ -0,0 +1,262 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.parse
+
+import http_client
+
+DEFAULT_DASHBOARD_URL = 'https://berobin.github.io/vps-date'
+TELEGRAM_API = 'https://api.telegram.org'
+
+
+class Notification:
+    """一条通知：text 为纯文本/HTML（Telegram、Webhook），markdown 供钉钉使用，缺省时用 text"""
+
+    def __init__(self, text, title='VPS通知', markdown=None):
+        self.text = text
+        self.title = title
+        self.markdown = markdown
+
+
+class RateLimiter:
+    """按固定间隔放行的限速器；与事件循环无关，可在多次 asyncio.run 之间共享"""
+
+    def __init__(self, rate, per=1.0):
+        self.interval = per / rate
+        self.next_free = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_free)
+            self.next_free = start + self.interval
+            return start - now
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_shared_limiters = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def shared_limiter(key, rate, per=1.0):
+    """同一个 key（如同一个机器人）在所有通道之间共用的限速器"""
+    with _shared_limiters_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = _shared_limiters[key] = RateLimiter(rate, per)
+        return limiter
+
+
+class Coalescer:
+    """合并短时间内的多个事件：第一个事件开始计时，window 秒后（或手动 flush 时）一次性交给 callback
+
+    window 为 0 时不缓冲，每个事件立即发送
+    """
+
+    def __init__(self, callback, window=300):
+        self.callback = callback
+        self.window = window
+        self.events = []
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def add(self, *events):
+        if not events:
+            return
+        with self.lock:
+            self.events.extend(events)
+            if self.window > 0 and self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if self.window <= 0:
+            self.flush()
+
+    def flush(self):
+        """立即发送已缓冲的事件，没有事件时什么也不做"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            events, self.events = self.events, []
+        if events:
+            self.callback(events)
+        return len(events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+class Channel:
+    name = 'channel'
+
+    def __init__(self):
+        self.limiters = []
+
+    @property
+    def key(self):
+        return self.name
+
+    def send(self, notification):
+        """同步发送，失败时抛出异常"""
+        raise NotImplementedError
+
+
+class TelegramChannel(Channel):
+    name = 'Telegram'
+
+    def __init__(self, bot_token, chat_id, dashboard_url=DEFAULT_DASHBOARD_URL, api_base=None):
+        super().__init__()
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.dashboard_url = dashboard_url
+        self.api_base = http_client.api_base('telegram', api_base) or TELEGRAM_API
+        # Telegram 限制：每个机器人约30条/秒，同一个聊天约1条/秒
+        self.limiters = [
+            shared_limiter(f'telegram:{bot_token}', 30),
+            shared_limiter(f'telegram:{bot_token}:{chat_id}', 1)
+        ]
+
+    @property
+    def key(self):
+        return f'telegram:{self.bot_token}:{self.chat_id}'
+
+    def send(self, notification):
+        message = notification.text
+        if self.dashboard_url:
+            message += f"\n\n👉 查看详情：{self.dashboard_url}"
+        url = f"{self.api_base}/bot{self.bot_token}/sendMessage"
+        data = {
+            "chat_id": self.chat_id,
+            "text": message,
+            "parse_mode": "HTML"
+        }
+        response = http_client.post(url, json=data)
+        response.raise_for_status()
+
+
+class DingTalkChannel(Channel):
+    name = '钉钉'
+
+    def __init__(self, webhook, secret='', api_base=None):
+        super().__init__()
+        # api_base 只替换 Webhook 的主机部分，access_token 不变
+        self.webhook = http_client.rebase(webhook, http_client.api_base('dingtalk', api_base))
+        self.secret = secret
+        # 钉钉机器人限制每分钟20条
+        self.limiters = [shared_limiter(f'dingtalk:{webhook}', 20, 60)]
+
+    @property
+    def key(self):
+        return f'dingtalk:{self.webhook}'
+
+    def signed_url(self):
+        """为钉钉消息签名"""
+        if not self.secret:
+            return self.webhook
+        timestamp = str(round(time.time() * 1000))
+        secret_enc = self.secret.encode('utf-8')
+        string_to_sign = '{}\n{}'.format(timestamp, self.secret)
+        string_to_sign_enc = string_to_sign.encode('utf-8')
+        hmac_code = hmac.new(secret_enc, string_to_sign_enc, digestmod=hashlib.sha256).digest()
+        sign = urllib.parse.quote_plus(base64.b64encode(hmac_code))
+        return f"{self.webhook}&timestamp={timestamp}&sign={sign}"
+
+    def send(self, notification):
+        data = {
+            "msgtype": "markdown",
+            "markdown": {
+                "title": notification.title,
+                "text": notification.markdown or notification.text.replace('<b>', '**').replace('</b>', '**')
+            }
+        }
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Accept': 'application/json'
+        }
+        json_data = json.dumps(data, ensure_ascii=False)
+        response = http_client.post(self.signed_url(), headers=headers, data=json_data.encode('utf-8'))
+        response.raise_for_status()
+        result = response.json()
+        if result.get('errcode', 0) != 0:
+            raise RuntimeError(result.get('errmsg', response.text))
+
+
+class WebhookChannel(Channel):
+    """通用 Webhook：POST {"title": ..., "text": ...}"""
+    name = 'Webhook'
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+
+    @property
+    def key(self):
+        return f'webhook:{self.url}'
+
+    def send(self, notification):
+        response = http_client.post(self.url, json={"title": notification.title, "text": notification.text})
+        response.raise_for_status()
+
+
+def channels_from_config(config):
+    """根据 config.json 创建所有已启用的通道"""
+    channels = []
+    telegram = config.get('telegram', {})
+    if telegram.get('enabled'):
+        channels.append(TelegramChannel(
+            telegram['bot_token'], telegram['chat_id'],
+            config.get('web_dashboard_url', DEFAULT_DASHBOARD_URL),
+            telegram.get('api_base')
+        ))
+    dingtalk = config.get('dingtalk', {})
+    if dingtalk.get('enabled') and dingtalk.get('webhook'):
+        channels.append(DingTalkChannel(dingtalk['webhook'], dingtalk.get('secret', ''), dingtalk.get('api_base')))
+    for webhook in config.get('webhooks', []):
+        if webhook.get('enabled', True) and webhook.get('url'):
+            channels.append(WebhookChannel(webhook['url']))
+    return channels
+
+
+class NotificationDispatcher:
+    """把通知同时发送到所有通道：各通道并发、按各自的限速排队，总耗时取决于最慢的通道"""
+
+    def __init__(self, channels, max_concurrency=4):
+        self.channels = []
+        seen = set()
+        for channel in channels:
+            if channel.key not in seen:
+                seen.add(channel.key)
+                self.channels.append(channel)
+        self.max_concurrency = max_concurrency
+
+    async def _deliver(self, channel, notification, semaphore):
+        for limiter in channel.limiters:
+            await limiter.acquire()
+        async with semaphore:
+            try:
+                await asyncio.to_thread(channel.send, notification)
+                return None
+            except Exception as e:
+                return e
+
+    async def dispatch(self, *notifications):
+        """返回 [(通道, 通知, 异常或None), ...]"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        jobs = [(channel, notification) for notification in notifications for channel in self.channels]
+        errors = await asyncio.gather(*(self._deliver(c, n, semaphore) for c, n in jobs))
+        return [(channel, notification, error) for (channel, notification), error in zip(jobs, errors)]
+
+    def send(self, *notifications):
+        if not self.channels or not notifications:
+            return []
+        return asyncio.run(self.dispatch(*notifications))
@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import http_client
+from vps_store import atomic_write
+
+METRICS_DIR = 'metrics'
+# <job>.jsonl 中最多保留的运行记录数
+MAX_HISTORY = 1000
+PREFIX = 'vps_monitor'
+QUANTILES = (0.5, 0.95)
+
+_active = None
+
+
+def active():
+    """当前正在记录的 RunMetrics（没有时为 None）"""
+    return _active
+
+
+@contextmanager
+def timed(stage):
+    """在当前运行中记录一个阶段的耗时；不在记录中时什么也不做（供解析等底层代码使用）"""
+    metrics = _active
+    if metrics is None:
+        yield
+        return
+    with metrics.stage(stage):
+        yield
+
+
+def record_error(name):
+    """在当前运行中计一次错误；不在记录中时什么也不做"""
+    metrics = _active
+    if metrics is not None:
+        metrics.error(name)
+
+
+def quantile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class RunMetrics:
+    """一次检查的计时和计数：各阶段耗时、扫描数量、提醒数量、HTTP请求和错误
+
+    start() 之后所有经过 http_client 的请求都会被记录（包括重试）；begin(阶段) 结束上一个阶段并开始下一个，
+    fail() 把错误计入当前阶段，finish() 结束记录，之后调用 write() 输出 Prometheus 文本格式（<job>.prom）
+    和每次运行一行的JSON（<job>.jsonl）。也可以用 with 包住整次检查。
+    stage()/timed() 记录嵌套的阶段（如 load 中从页面导入时的 parse），同名阶段的耗时累加
+    """
+
+    def __init__(self, job, directory=METRICS_DIR):
+        self.job = job
+        self.directory = directory
+        self.started_at = time.time()
+        self.perf_start = time.perf_counter()
+        self.duration = None
+        self.stages = {}
+        self.counters = {}
+        self.errors = {}
+        self.http = {}
+        self.current = None
+        self.current_start = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        global _active
+        _active = self
+        http_client.add_observer(self.observe_http)
+        return self
+
+    def begin(self, stage):
+        """结束当前阶段并开始 stage"""
+        self.end()
+        self.current, self.current_start = stage, time.perf_counter()
+
+    def end(self):
+        if self.current is not None:
+            self._add_time(self.current, time.perf_counter() - self.current_start)
+            self.current = None
+
+    def fail(self):
+        """检查出错：计入当前阶段（没有阶段时为 run）的错误数"""
+        self.error(self.current or 'run')
+
+    def finish(self):
+        global _active
+        self.end()
+        http_client.remove_observer(self.observe_http)
+        if _active is self:
+            _active = None
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.perf_start
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.fail()
+        self.finish()
+        return False
+
+    def _add_time(self, name, elapsed):
+        with self.lock:
+            total, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + elapsed, calls + 1)
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个阶段的耗时，阶段中抛出异常时计入该阶段的错误数"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(name)
+            raise
+        finally:
+            self._add_time(name, time.perf_counter() - start)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self.lock:
+            self.counters[name] = value
+
+    def error(self, name):
+        with self.lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def observe_http(self, method, url, status, elapsed, error=None):
+        """http_client 每次请求（每次重试也算一次）完成后调用；status 为 None 表示连接失败或超时"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            entry = self.http.setdefault(host, {'statuses': {}, 'latencies': [], 'errors': 0})
+            key = str(status) if status is not None else type(error).__name__ if error else 'error'
+            entry['statuses'][key] = entry['statuses'].get(key, 0) + 1
+            entry['latencies'].append(elapsed)
+            if status is None or status >= 400:
+                entry['errors'] += 1
+
+    def to_dict(self):
+        with self.lock:
+            http = {
+                host: {
+                    'requests': len(entry['latencies']),
+                    'errors': entry['errors'],
+                    'statuses': dict(entry['statuses']),
+                    'seconds_total': sum(entry['latencies']),
+                    'seconds_p50': quantile(entry['latencies'], 0.5),
+                    'seconds_p95': quantile(entry['latencies'], 0.95),
+                    'seconds_max': max(entry['latencies'])
+                }
+                for host, entry in self.http.items()
+            }
+            return {
+                'job': self.job,
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'duration': self.duration if self.duration is not None else time.perf_counter() - self.perf_start,
+                'stages': {name: round(total, 6) for name, (total, _) in self.stages.items()},
+                'counters': dict(self.counters),
+                'errors': dict(self.errors),
+                'http': http
+            }
+
+    def prometheus(self):
+        """Prometheus 文本格式（可由 node_exporter 的 textfile collector 读取）"""
+        data = self.to_dict()
+        job = self.job
+        lines = [
+            f'# HELP {PREFIX}_run_duration_seconds 上次检查的总耗时',
+            f'# TYPE {PREFIX}_run_duration_seconds gauge',
+            f'{PREFIX}_run_duration_seconds{_labels(job=job)} {data["duration"]:.6f}',
+            f'# HELP {PREFIX}_last_run_timestamp_seconds 上次检查开始的时间',
+            f'# TYPE {PREFIX}_last_run_timestamp_seconds gauge',
+            f'{PREFIX}_last_run_timestamp_seconds{_labels(job=job)} {self.started_at:.0f}',
+            f'# HELP {PREFIX}_stage_duration_seconds 上次检查各阶段的耗时',
+            f'# TYPE {PREFIX}_stage_duration_seconds gauge',
+        ]
+        lines += [f'{PREFIX}_stage_duration_seconds{_labels(job=job, stage=name)} {seconds:.6f}'
+                  for name, seconds in sorted(data['stages'].items())]
+        for name, value in sorted(data['counters'].items()):
+            lines += [f'# TYPE {PREFIX}_{name} gauge', f'{PREFIX}_{name}{_labels(job=job)} {value}']
+        lines += [f'# HELP {PREFIX}_errors 上次检查各阶段的错误数', f'# TYPE {PREFIX}_errors gauge']
+        lines += [f'{PREFIX}_errors{_labels(job=job, stage=name)} {value}' for name, value in sorted(data['errors'].items())]
+        lines += [f'# HELP {PREFIX}_http_requests 上次检查的HTTP请求数（含重试）',
+                  f'# TYPE {PREFIX}_http_requests gauge']
+        for host, entry in sorted(data['http'].items()):
+            lines += [f'{PREFIX}_http_requests{_labels(job=job, host=host, status=status)} {count}'
+                      for status, count in sorted(entry['statuses'].items())]
+        lines += [f'# HELP {PREFIX}_http_request_duration_seconds 上次检查的HTTP请求耗时',
+                  f'# TYPE {PREFIX}_http_request_duration_seconds summary']
+        with self.lock:
+            latencies = {host: list(entry['latencies']) for host, entry in self.http.items()}
+        for host, entry in sorted(data['http'].items()):
+            lines += [f'{PREFIX}_http_request_duration_seconds{_labels(job=job, host=host, quantile=q)} '
+                      f'{quantile(latencies[host], q):.6f}' for q in QUANTILES]
+            lines.append(f'{PREFIX}_http_request_duration_seconds_sum{_labels(job=job, host=host)} '
+                         f'{entry["seconds_total"]:.6f}')
+            lines.append(f'{PREFIX}_http_request_duration_seconds_count{_labels(job=job, host=host)} '
+                         f'{entry["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """写入 <job>.prom（覆盖）并在 <job>.jsonl 末尾追加本次运行，失败时只记录日志"""
+        if not self.directory:
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write(os.path.join(self.directory, f'{self.job}.prom'), self.prometheus())
+            history_file = os.path.join(self.directory, f'{self.job}.jsonl')
+            history = []
+            if os.path.exists(history_file):
+                with open(history_file, 'r', encoding='utf-8') as f:
+                    history = f.readlines()[-(MAX_HISTORY - 1):]
+            history.append(json.dumps(self.to_dict(), ensure_ascii=False) + '\n')
+            atomic_write(history_file, ''.join(history))
+            return True
+        except OSError as e:
+            logging.error(f"写入运行指标失败: {str(e)}")
+            return False
@@ -0,0 +1,128 @@
+from bisect import bisect_left
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # 没有 NumPy 时退回纯Python实现
+    np = None
+
+# 剩余天数分桶的上界：0~3天、4~7天、8~30天，其余为30天以上
+BUCKET_EDGES = (3, 7, 30)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def bucket_labels(edges=BUCKET_EDGES):
+    labels = ['overdue']
+    low = 0
+    for edge in edges:
+        labels.append(f'{low}-{edge}')
+        low = edge + 1
+    labels.append(f'>{edges[-1]}')
+    labels.append('undated')
+    return labels
+
+
+class ExpiryBatch:
+    """一次性载入所有到期日、费用和币种，整批计算剩余天数、到期筛选和分桶统计
+
+    安装了 NumPy 时到期日存为 datetime64[D] 数组、整批向量化计算，
+    否则退回逐条计算，结果相同。适合一次性评估整个（或聚合后的）清单。
+    """
+
+    def __init__(self, records, use_numpy=True):
+        self.records = list(records)
+        self.currencies = sorted({r.currency for r in self.records})
+        currency_codes = {currency: i for i, currency in enumerate(self.currencies)}
+        self.vectorized = use_numpy and np is not None
+        count = len(self.records)
+
+        if self.vectorized:
+            self.dated = np.fromiter((r.due is not None for r in self.records), dtype=bool, count=count)
+            due_days = np.fromiter(
+                (r.due - EPOCH_ORDINAL if r.due is not None else 0 for r in self.records),
+                dtype=np.int64, count=count
+            )
+            self.due = due_days.astype('datetime64[D]')
+            self.due[~self.dated] = np.datetime64('NaT')
+            self.cost = np.fromiter((r.cost for r in self.records), dtype=np.float64, count=count)
+            self.currency_code = np.fromiter(
+                (currency_codes[r.currency] for r in self.records), dtype=np.int32, count=count
+            )
+        else:
+            self.dated = [r.due is not None for r in self.records]
+            self.due = [r.due for r in self.records]
+            self.cost = [r.cost for r in self.records]
+            self.currency_code = [currency_codes[r.currency] for r in self.records]
+
+    def __len__(self):
+        return len(self.records)
+
+    def days_left(self, today):
+        """每条记录的剩余天数（today 为日期序数）；没有到期日的位置无意义，需配合 dated 使用"""
+        if self.vectorized:
+            today64 = np.datetime64(date.fromordinal(today), 'D')
+            days = (self.due - today64).astype(np.int64)
+            days[~self.dated] = 0
+            return days
+        return [due - today if due is not None else 0 for due in self.due]
+
+    def expiring(self, today, min_days=None, max_days=None):
+        """剩余天数在 [min_days, max_days] 之间的 [(record, days_left), ...]，按剩余天数排序
+
+        min_days / max_days 为 None 表示不限
+        """
+        days = self.days_left(today)
+        if self.vectorized:
+            mask = self.dated.copy()
+            if min_days is not None:
+                mask &= days >= min_days
+            if max_days is not None:
+                mask &= days <= max_days
+            positions = np.flatnonzero(mask)
+            positions = positions[np.argsort(days[positions], kind='stable')]
+            return [(self.records[i], int(days[i])) for i in positions]
+        low = float('-inf') if min_days is None else min_days
+        high = float('inf') if max_days is None else max_days
+        matches = [
+            (record, d) for record, d, dated in zip(self.records, days, self.dated)
+            if dated and low <= d <= high
+        ]
+        return sorted(matches, key=lambda item: item[1])
+
+    def bucket_counts(self, today, edges=BUCKET_EDGES):
+        """按剩余天数分桶计数：overdue、0-3、4-7、8-30、>30 和 undated（没有到期日）"""
+        labels = bucket_labels(edges)
+        days = self.days_left(today)
+        if self.vectorized:
+            dated_days = days[self.dated]
+            overdue = int(np.count_nonzero(dated_days < 0))
+            upcoming = dated_days[dated_days >= 0]
+            counts = np.bincount(
+                np.searchsorted(np.asarray(edges), upcoming, side='left'), minlength=len(edges) + 1
+            ).tolist()
+            undated = len(self.records) - int(np.count_nonzero(self.dated))
+        else:
+            overdue = undated = 0
+            counts = [0] * (len(edges) + 1)
+            for d, dated in zip(days, self.dated):
+                if not dated:
+                    undated += 1
+                elif d < 0:
+                    overdue += 1
+                else:
+                    counts[bisect_left(edges, d)] += 1
+        return dict(zip(labels, [overdue] + counts + [undated]))
+
+    def currency_totals(self):
+        """{币种: (数量, 总费用)}"""
+        if self.vectorized:
+            size = len(self.currencies)
+            counts = np.bincount(self.currency_code, minlength=size)
+            totals = np.bincount(self.currency_code, weights=self.cost, minlength=size)
+            return {c: (int(counts[i]), float(totals[i])) for i, c in enumerate(self.currencies)}
+        stats = {currency: [0, 0.0] for currency in self.currencies}
+        for code, cost in zip(self.currency_code, self.cost):
+            entry = stats[self.currencies[code]]
+            entry[0] += 1
+            entry[1] += cost
+        return {currency: tuple(entry) for currency, entry in stats.items()}
@@ -0,0 +1,109 @@
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date
+
+from vps_record import format_date
+
+# 每个计费周期包含的月数
+CYCLE_MONTHS = {
+    'Monthly': 1,
+    'Quarterly': 3,
+    'Semi-Annually': 6,
+    'Annually': 12,
+    'Biennially': 24,
+    'Triennially': 36
+}
+
+
+def add_months(ordinal, months, day=None):
+    """日期序数加上若干个月；目标月份没有该日时取月末（1月31日 + 1个月 = 2月28/29日）
+
+    day 为账单日，默认取原日期的日，连续推算时传入可避免月末日期越推越早
+    """
+    d = date.fromordinal(ordinal)
+    year, month = divmod(d.year * 12 + d.month - 1 + months, 12)
+    month += 1
+    return date(year, month, min(day or d.day, monthrange(year, month)[1])).toordinal()
+
+
+def _first_cycle(due, months, today):
+    """满足 add_months(due, k * months) >= today 的最小 k（k >= 0）"""
+    if due >= today:
+        return 0
+    d, t = date.fromordinal(due), date.fromordinal(today)
+    k = max(((t.year - d.year) * 12 + t.month - d.month) // months, 1)
+    while add_months(due, k * months) < today:
+        k += 1
+    while k > 1 and add_months(due, (k - 1) * months) >= today:
+        k -= 1
+    return k
+
+
+def next_due_after(due, cycle, today):
+    """按计费周期把到期日顺延到 today 当天或之后；未知周期原样返回"""
+    months = CYCLE_MONTHS.get(cycle)
+    if not months:
+        return due
+    return add_months(due, _first_cycle(due, months, today) * months)
+
+
+def monthly_due(day, today):
+    """旧格式 monthlyExpireDay：today 当天或之后的下一个续费日（跨年、小月都按月末处理）"""
+    t = date.fromordinal(today)
+    this_month = date(t.year, t.month, min(day, monthrange(t.year, t.month)[1])).toordinal()
+    if this_month >= today:
+        return this_month
+    return add_months(date(t.year, t.month, 1).toordinal(), 1, day)
+
+
+class RenewalCalendar:
+    """预先展开一段时间内（默认3年）所有VPS的续费日，按日期排序，可整批区间查询"""
+
+    def __init__(self, records, start, years=3):
+        self.start = start
+        self.end = add_months(start, 12 * years)
+        entries = []
+        for record in records:
+            entries.extend((due, record) for due in self.occurrences(record))
+        entries.sort(key=lambda entry: entry[0])
+        self._dates = [due for due, _ in entries]
+        self._records = [record for _, record in entries]
+
+    def occurrences(self, record):
+        """单台VPS在 [start, end) 内的所有续费日"""
+        months = CYCLE_MONTHS.get(record.billing_cycle)
+        if record.due is not None and months:
+            base = record.due
+            k = _first_cycle(base, months, self.start)
+            due = add_months(base, k * months)
+            while due < self.end:
+                yield due
+                k += 1
+                due = add_months(base, k * months)
+        elif record.due is not None:
+            if self.start <= record.due < self.end:
+                yield record.due
+        elif record.monthly_day is not None:
+            due = monthly_due(record.monthly_day, self.start)
+            while due < self.end:
+                yield due
+                due = add_months(due, 1, record.monthly_day)
+
+    def __len__(self):
+        return len(self._dates)
+
+    def __iter__(self):
+        return iter(zip(self._dates, self._records))
+
+    def between(self, start, end):
+        """续费日在 [start, end] 之间的 [(日期序数, record), ...]"""
+        lo = bisect_left(self._dates, start)
+        hi = bisect_right(self._dates, end)
+        return list(zip(self._dates[lo:hi], self._records[lo:hi]))
+
+    def by_month(self):
+        """{'YYYY-MM': [(日期序数, record), ...]}"""
+        months = {}
+        for due, record in self:
+            months.setdefault(format_date(due)[:7], []).append((due, record))
+        return months
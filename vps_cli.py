@@ -0,0 +1,202 @@
+"""VPS清单命令行工具（非交互）
+
+用法:
+    python vps_manager.py import servers.csv [--replace] [--dry-run]
+    python vps_manager.py export [servers.jsonl] [--format csv]
+    python vps_manager.py list [--days 30]
+    python vps_manager.py check [--days 3] [--notify]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from vps_billing import CYCLE_MONTHS
+from vps_record import KNOWN_KEYS, VPSRecord, format_date, parse_date, today_ordinal
+
+CSV_FIELDS = ('name', 'cost', 'currency', 'billingCycle', 'nextDueDate', 'url')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if path and path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(path, fmt):
+    """逐行读取，返回 [(行号, dict), ...]；JSONL 中的空行跳过"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            return [(line, row) for line, row in enumerate(csv.DictReader(f), 2)]
+        rows = []
+        for line, text in enumerate(f, 1):
+            if text.strip():
+                rows.append((line, json.loads(text)))
+        return rows
+
+
+def validate_row(row):
+    """校验一行数据并转换为 VPSRecord，数据无效时抛出 ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError("不是对象")
+    row = {key: value for key, value in row.items() if key and value not in (None, '')}
+    name = str(row.get('name', '')).strip()
+    if not name:
+        raise ValueError("name 不能为空")
+    try:
+        cost = float(row.get('cost'))
+    except (TypeError, ValueError):
+        raise ValueError(f"cost 无效: {row.get('cost')!r}")
+    if cost < 0:
+        raise ValueError(f"cost 不能为负数: {cost}")
+    currency = str(row.get('currency', '')).strip().upper()
+    if len(currency) != 3 or not currency.isalpha():
+        raise ValueError(f"currency 无效: {row.get('currency')!r}")
+    cycle = row.get('billingCycle')
+    if cycle not in CYCLE_MONTHS:
+        raise ValueError(f"billingCycle 无效: {cycle!r}，可选: {', '.join(CYCLE_MONTHS)}")
+    if parse_date(row.get('nextDueDate')) is None:
+        raise ValueError(f"nextDueDate 无效: {row.get('nextDueDate')!r} (应为 YYYY-MM-DD)")
+    row.update(name=name, cost=cost, currency=currency)
+    return VPSRecord.from_dict(row)
+
+
+def load_records(path, fmt):
+    """一次读取并校验整个文件，返回 (records, errors)"""
+    records, errors = [], []
+    try:
+        rows = read_rows(path, fmt)
+    except (OSError, ValueError) as e:
+        return [], [f"读取 {path} 失败: {e}"]
+    first_line = {}
+    for line, row in rows:
+        try:
+            record = validate_row(row)
+        except ValueError as e:
+            errors.append(f"第 {line} 行: {e}")
+            continue
+        # 导入按名称更新已有的VPS，同一个文件中重名会互相覆盖
+        if record.name in first_line:
+            errors.append(f"第 {line} 行: name 重复: {record.name!r}（与第 {first_line[record.name]} 行相同）")
+            continue
+        first_line[record.name] = line
+        records.append(record)
+    return records, errors
+
+
+def cmd_import(manager, args):
+    fmt = detect_format(args.file, args.format)
+    records, errors = load_records(args.file, fmt)
+    if errors:
+        print(f"校验失败，共 {len(errors)} 个错误，未导入任何数据:", file=sys.stderr)
+        for error in errors[:50]:
+            print(f"  {error}", file=sys.stderr)
+        if len(errors) > 50:
+            print(f"  ... 另有 {len(errors) - 50} 个错误", file=sys.stderr)
+        return 1
+    if args.dry_run:
+        print(f"校验通过: {len(records)} 台VPS (未写入)")
+        return 0
+    # 整批只写入一次数据存储和 index.html，只发送一条通知
+    with manager.batch():
+        added, updated = manager.upsert_records(records, replace=args.replace)
+    manager.change_notices.flush()
+    print(f"导入完成: 新增 {added} 台，更新 {updated} 台，当前共 {len(manager.vps_data)} 台")
+    return 0
+
+
+def cmd_export(manager, args):
+    fmt = detect_format(args.file, args.format)
+    out = open(args.file, 'w', encoding='utf-8', newline='') if args.file else sys.stdout
+    try:
+        if fmt == 'csv':
+            extra_fields = sorted({key for vps in manager.vps_data for key in (vps.extra or {})})
+            fields = list(CSV_FIELDS) + [key for key in KNOWN_KEYS if key not in CSV_FIELDS] + extra_fields
+            writer = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            for vps in manager.vps_data:
+                writer.writerow(vps.to_dict())
+        else:
+            for vps in manager.vps_data:
+                out.write(json.dumps(vps.to_dict(), ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.file:
+        print(f"已导出 {len(manager.vps_data)} 台VPS到 {args.file}")
+    return 0
+
+
+def cmd_list(manager, args):
+    today = today_ordinal()
+    records = manager.vps_data
+    if args.days is not None:
+        records = manager.due_index.between(today, today + args.days)
+    for vps in records:
+        if vps.due is not None:
+            due = f"{format_date(vps.due)} ({vps.days_left(today)}天)"
+        elif vps.monthly_day is not None:
+            due = f"每月{vps.monthly_day}日"
+        else:
+            due = 'N/A'
+        print(f"{vps.name}\t{vps.cost} {vps.currency}\t{vps.billing_cycle or '旧格式'}\t{due}")
+    print(f"共 {len(records)} 台", file=sys.stderr)
+    return 0
+
+
+def cmd_check(manager, args):
+    today = today_ordinal()
+    expiring = manager.due_index.due_within(today, args.days)
+    for vps in expiring:
+        print(f"{vps.name}: 还有 {vps.days_left(today)} 天到期 ({format_date(vps.due)})")
+    if not expiring:
+        print(f"{args.days}天内没有到期的VPS")
+    if args.notify:
+        # 与定时检测共用提醒记录，已提醒过的不会重复发送
+        manager.check_expiring_vps(args.days)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='vps_manager.py', description='VPS到期监控 - 命令行模式')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('import', help='从 CSV/JSONL 批量导入（同名VPS会被更新）')
+    p.add_argument('file')
+    p.add_argument('--format', choices=('csv', 'jsonl'), help='默认按扩展名判断')
+    p.add_argument('--replace', action='store_true', help='先删除所有现有VPS')
+    p.add_argument('--dry-run', action='store_true', help='只校验，不写入')
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('export', help='导出为 CSV/JSONL（默认输出 JSONL 到标准输出）')
+    p.add_argument('file', nargs='?')
+    p.add_argument('--format', choices=('csv', 'jsonl'))
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('list', help='列出VPS')
+    p.add_argument('--days', type=int, help='只列出N天内到期的VPS')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('check', help='检查即将到期的VPS')
+    p.add_argument('--days', type=int, default=3)
+    p.add_argument('--notify', action='store_true', help='发送到期提醒（已提醒过的不重复发送）')
+    p.set_defaults(func=cmd_check)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'import' and not os.path.exists(args.file):
+        print(f"文件不存在: {args.file}", file=sys.stderr)
+        return 1
+    from vps_manager import VPSManager
+    manager = VPSManager()
+    try:
+        return args.func(manager, args)
+    finally:
+        manager.store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from urllib.parse import urlsplit
+
+from vps_billing import CYCLE_MONTHS
+
+DIMENSIONS = ('currency', 'billing_cycle', 'provider')
+UNKNOWN_PROVIDER = '未知'
+
+
+def monthly_cost(record):
+    """折算为每月费用，与 index.html 中的 normalizeToMonthlyCost 相同：未知周期按月付计算"""
+    return record.cost / CYCLE_MONTHS.get(record.billing_cycle, 1)
+
+
+def provider_of(record):
+    """服务商：取管理地址的域名（去掉 www. 等子域名），没有地址时为“未知”"""
+    host = urlsplit(record.url or '').hostname
+    if not host:
+        return UNKNOWN_PROVIDER
+    labels = host.split('.')
+    return '.'.join(labels[-2:]) if len(labels) > 2 else host
+
+
+class CostRollup:
+    """按 (币种, 计费周期, 服务商) 分组维护的费用累计值
+
+    添加、修改、删除时只调整对应分组，统计时只遍历分组而不是所有VPS。
+    每台VPS上次计入的分组和金额记录下来，修改记录后调用 update 即可，无需提供旧值
+    """
+
+    def __init__(self, records=()):
+        self.groups = {}
+        self.entries = {}
+        for record in records:
+            self.add(record)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _apply(self, key, cost, monthly, sign):
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = [0, 0.0, 0.0]
+        group[0] += sign
+        group[1] += sign * cost
+        group[2] += sign * monthly
+        if group[0] == 0:
+            del self.groups[key]
+
+    def add(self, record):
+        key = (record.currency, record.billing_cycle, provider_of(record))
+        entry = (key, record.cost, monthly_cost(record))
+        self.entries[id(record)] = entry
+        self._apply(*entry, 1)
+
+    def remove(self, record):
+        entry = self.entries.pop(id(record), None)
+        if entry is not None:
+            self._apply(*entry, -1)
+
+    def update(self, record):
+        """记录的费用、币种、计费周期或地址修改后重新计入"""
+        self.remove(record)
+        self.add(record)
+
+    def totals(self, by='currency'):
+        """{分组值: (数量, 原始费用合计, 每月费用合计)}，by 为 currency、billing_cycle 或 provider"""
+        position = DIMENSIONS.index(by)
+        result = {}
+        for key, (count, cost, monthly) in self.groups.items():
+            entry = result.setdefault(key[position], [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += cost
+            entry[2] += monthly
+        return {value: tuple(entry) for value, entry in result.items()}
+
+    def converted(self, rates, by='currency'):
+        """按汇率折算为基准货币：{分组值: (数量, 每月费用, 每年费用)}；没有汇率的币种不计入"""
+        result = {}
+        for key, (count, _, monthly) in self.groups.items():
+            rate = rates.get(key[0])
+            if not rate:
+                continue
+            entry = result.setdefault(key[DIMENSIONS.index(by)], [0, 0.0])
+            entry[0] += count
+            entry[1] += monthly / rate
+        return {value: (count, monthly, monthly * 12) for value, (count, monthly) in result.items()}
+
+    def missing_rates(self, rates):
+        """没有汇率、无法折算的币种"""
+        return sorted({key[0] for key in self.groups if not rates.get(key[0])})
@@ -1,12 +1,25 @@
 import json
 import os
-import requests
+import sys
 import hmac
 import hashlib
 import base64
 import urllib.parse
 import time
+from alert_ledger import AlertLedger
+from contextlib import contextmanager
 from datetime import datetime
+import run_metrics
+from exchange_rates import DEFAULT_TTL, RateCache, providers_from_config, rates_js, write_rates_js
+from vps_costs import CostRollup
+from vps_shards import (SHARD_DIR, SHARD_KEYS, check_loaded, render_scripts, render_shard, script_locations,
+                        script_paths, shard_key, shard_path, strip_scripts)
+from vps_billing import RenewalCalendar, add_months, next_due_after
+from notifier import Coalescer, Notification, NotificationDispatcher, TelegramChannel, channels_from_config
+from vps_parser import iter_vps_services, vps_services_span, VPSServicesNotFound
+from vps_record import DueIndex, VPSRecord, format_date, parse_date, today_ordinal
+from vps_render import PAGE_DIR, PAGE_SIZE, DashboardView, apply_view, page_rates, strip_view, write_pages
+from vps_store import VPSStore, atomic_write
 
 class NotificationManager:
     def __init__(self):
@@ -16,7 +29,8 @@ class NotificationManager:
     def load_config(self):
         if not os.path.exists(self.config_file):
             default_config = {
-                "telegram": {"enabled": False, "bot_token": "", "chat_id": ""}
+                "telegram": {"enabled": False, "bot_token": "", "chat_id": ""},
+                "dingtalk": {"enabled": False, "webhook": "", "secret": ""}
             }
             with open(self.config_file, 'w') as f:
                 json.dump(default_config, f, indent=4)
@@ -26,8 +40,7 @@ class NotificationManager:
             return json.load(f)
 
     def save_config(self):
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=4)
+        atomic_write(self.config_file, json.dumps(self.config, indent=4))
 
     def setup_telegram(self):
         print("\n=== Telegram配置 ===")
@@ -40,35 +53,57 @@ class NotificationManager:
         self.save_config()
         print("Telegram配置已保存！")
 
+    def setup_dingtalk(self):
+        print("\n=== 钉钉配置 ===")
+        dingtalk = self.config.setdefault('dingtalk', {"enabled": False, "webhook": "", "secret": ""})
+        dingtalk['enabled'] = input("启用钉钉通知? (y/n): ").lower() == 'y'
+        
+        if dingtalk['enabled']:
+            dingtalk['webhook'] = input("Webhook: ")
+            dingtalk['secret'] = input("加签密钥 (没有则回车): ")
+        self.save_config()
+        print("钉钉配置已保存！")
+
+    def channels(self):
+        return channels_from_config(self.config)
+
+    def change_window(self):
+        """修改通知的合并时间（秒），0 表示每次保存都发送"""
+        try:
+            return max(float(self.config.get('change_notify_window', 300)), 0)
+        except (TypeError, ValueError):
+            return 300
+
+    def notify(self, message, title='VPS通知', markdown=None, channels=None):
+        """把一条通知同时发送到所有已启用的通道（Telegram、钉钉、Webhook）"""
+        dispatcher = NotificationDispatcher(self.channels() if channels is None else channels)
+        results = dispatcher.send(Notification(message, title, markdown))
+        for channel, _, error in results:
+            if error:
+                print(f"发送{channel.name}通知失败: {str(error)}")
+        return results
+
     def send_telegram(self, message):
         """发送Telegram通知"""
-        try:
-            if not self.config['telegram']['enabled']:
-                return
-                
-            bot_token = self.config['telegram']['bot_token']
-            chat_id = self.config['telegram']['chat_id']
-            
-            base_url = self.config.get('web_dashboard_url', 'https://berobin.github.io/vps-date')
-            message += f"\n\n👉 查看详情：{base_url}"
-            
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            data = {
-                "chat_id": chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-            
-            response = requests.post(url, json=data)
-            response.raise_for_status()
-            
-        except Exception as e:
-            print(f"发送Telegram通知失败: {str(e)}")
+        return self.notify(message, channels=[c for c in self.channels() if isinstance(c, TelegramChannel)])
 
 class VPSManager:
-    def __init__(self):
+    def __init__(self, row_cache=None):
+        """row_cache 传给 VPSStore.load：常驻监控重复载入时只解析有变化的行（此时记录只读）"""
         self.vps_file = 'index.html'
+        self.dashboard_template = None
+        self.store = VPSStore()
+        self.row_cache = row_cache
+        self.vps_ids = []
         self.vps_data = self.load_vps_data()
+        self.due_index = DueIndex(self.vps_data)
+        self.costs = CostRollup(self.vps_data)
+        self.next_id = max(self.vps_ids, default=0) + 1
+        self.pending_changes = []
+        self.pending_events = []
+        self.batch_depth = 0
+        # 批量修改期间汇率有更新，页面要在 commit() 时按新汇率重新生成
+        self.rerender_pending = False
         self.currencies = [
             'USD', 'EUR', 'CNY', 'CAD', 'HKD', 'JPY', 'GBP', 'AUD',
             'SGD', 'KRW', 'TWD', 'RUB', 'CHF', 'SEK', 'NOK', 'DKK',
@@ -90,57 +125,283 @@ class VPSManager:
             'Biennially': '2年付',
             'Triennially': '3年付'
         }
-        self.exchange_rates = {}
         self.notification = NotificationManager()
+        # 分片：按服务商/负责人/币种把数据写到 shards/ 下的多个文件，修改时只重写相关分片
+        self.shard_by = self.notification.config.get('shard_by')
+        if self.shard_by not in SHARD_KEYS:
+            self.shard_by = None
+        self.shard_of = {}
+        if self.shard_by:
+            shard_of = {vps_id: shard_key(vps, self.shard_by) for vps_id, vps in zip(self.vps_ids, self.vps_data)}
+            # 页面已经引用了这些分片文件：之后只重写有修改的分片；否则（文件名规则变了等）第一次保存时整体重写
+            if self.dashboard_scripts() == self.shard_scripts(set(shard_of.values())):
+                self.shard_of = shard_of
+        # 汇率缓存在数据存储中，启动时直接读取，货币统计无需先联网更新
+        self.rate_cache = RateCache(
+            self.store, 'CNY',
+            self.notification.config.get('exchange_rate_ttl', DEFAULT_TTL),
+            providers_from_config(self.notification.config.get('exchange_rate_sources'),
+                                  self.notification.config.get('exchange_rate_api_base'))
+        )
+        cached_rates = self.rate_cache.cached()
+        self.exchange_rates = cached_rates['rates'] if cached_rates else {}
+        # 多次保存的修改通知合并为一条，窗口结束或退出时发送
+        self.change_notices = Coalescer(self.send_change_summary, self.notification.change_window())
 
     def load_vps_data(self):
+        """从数据存储读取VPS列表；首次运行或 index.html 被手动修改过时从页面导入"""
+        try:
+            if self.store.is_empty() or self.dashboard_changed():
+                vps_data = self.load_dashboard_data()
+                if vps_data or self.store.is_empty():
+                    self.vps_ids = self.store.replace_all(vps_data)
+                    self.remember_dashboard()
+                    return vps_data
+            rows = self.store.load(self.row_cache)
+            self.vps_ids = [vps_id for vps_id, _ in rows]
+            return [vps for _, vps in rows]
+        except Exception as e:
+            print(f"Load data failed: {e}")
+            return []
+
+    def load_dashboard_data(self):
+        """解析 index.html 中的 vpsServices（仅用于导入）；分片模式下解析页面引用的所有分片文件"""
         try:
             with open(self.vps_file, 'r', encoding='utf-8') as f:
                 content = f.read()
-                start = content.find('const vpsServices = [')
-                if start == -1: return []
-                end = content.find('];', start) + 1
-                vps_str = content[start:end].replace('const vpsServices = ', '')
-                return json.loads(vps_str)
+            sources = [content]
+            locations = script_locations(content, self.vps_file)
+            for location in locations:
+                with open(location, 'r', encoding='utf-8') as f:
+                    sources.append(f.read())
+            records = []
+            with run_metrics.timed('parse'):
+                for source in sources:
+                    for item in iter_vps_services(source):
+                        try:
+                            records.append(VPSRecord.from_dict(item))
+                        except (KeyError, TypeError, ValueError) as e:
+                            print(f"跳过无效记录 {item}: {e}")
+            check_loaded(len(records), locations)
+            return records
+        except VPSServicesNotFound:
+            return []
         except Exception as e:
             print(f"Load data failed: {e}")
             return []
 
-    def save_vps_data(self):
+    def dashboard_stat(self):
+        try:
+            st = os.stat(self.vps_file)
+            return [st.st_mtime_ns, st.st_size]
+        except OSError:
+            return None
+
+    def dashboard_changed(self):
+        """index.html 在上次生成之后是否被改动过"""
+        stat = self.dashboard_stat()
+        return stat is not None and stat != self.store.get_meta('dashboard_stat')
+
+    def dashboard_scripts(self):
+        """index.html 当前引用的分片文件（不是分片模式时为空）"""
         try:
             with open(self.vps_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            start = content.find('const vpsServices = [')
-            end = content.find('];', start) + 1
-            
-            # Ensure new fields exist gracefully
-            vps_data_to_save = []
-            for vps in self.vps_data:
-                # Remove old keys if new ones exist
-                if 'billingCycle' in vps and 'nextDueDate' in vps:
-                    vps.pop('expireDate', None)
-                    vps.pop('monthlyExpireDay', None)
-                vps_data_to_save.append(vps)
-
-            new_content = (
-                content[:start] + 
-                'const vpsServices = ' + 
-                json.dumps(vps_data_to_save, ensure_ascii=False, indent=4) +
-                content[end:]
-            )
-            
-            with open(self.vps_file, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            print("\n保存成功！")
-            
-            message = "VPS信息已更新\n"
-            message += f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            message += f"当前监控: {len(self.vps_data)}台服务器"
-            self.send_notification(message)
+                return script_paths(f.read())
+        except OSError:
+            return []
+
+    @staticmethod
+    def shard_scripts(keys):
+        return [shard_path(key).replace(os.sep, '/') for key in sorted(keys)]
+
+    def remember_dashboard(self):
+        self.store.set_meta('dashboard_stat', self.dashboard_stat())
+
+    def render_dashboard(self, changes=None):
+        """用当前数据重新生成 index.html；分片模式下只重写 changes 涉及的分片文件"""
+        if self.dashboard_template is None:
+            with open(self.vps_file, 'r', encoding='utf-8') as f:
+                content = strip_view(strip_scripts(f.read()))
+            start, end = vps_services_span(content)
+            self.dashboard_template = (content[:start], content[end:])
+
+        if self.shard_by:
+            self.render_shards(changes)
+            return
+
+        head, tail = self.dashboard_template
+        # 月度人民币单价、到期日、排序和第一页卡片在这里算好，浏览器打开页面时不再计算；
+        # 没有缓存的汇率时沿用页面中原有的汇率
+        rates = self.exchange_rates or page_rates(tail)
+        view = DashboardView(self.vps_data, rates, self.billing_cycles, today_ordinal(),
+                             self.notification.config.get('dashboard_page_size') or PAGE_SIZE)
+        files = view.page_files(PAGE_DIR)
+        write_pages(files, PAGE_DIR, atomic_write)
+        head, tail = apply_view((head, tail), view, files, rates, PAGE_DIR)
+        # 分页时卡片数据在 dashboard/ 中，页面里的 vpsServices 只用于导入和 ding_monitor，不再缩进
+        indent, separators = (4, None) if view.inline else (None, (',', ':'))
+        new_content = (
+            head +
+            'vpsServices = ' +
+            json.dumps([vps.to_dict() for vps in self.vps_data], ensure_ascii=False, indent=indent,
+                       separators=separators) +
+            tail
+        )
+        atomic_write(self.vps_file, new_content)
+        self.remember_dashboard()
+
+    def render_shards(self, changes=None):
+        """分片模式：每个分片一个 shards/*.js 文件，index.html 只引用这些文件，分片增减时才重写"""
+        new_shard_of = {vps_id: shard_key(vps, self.shard_by) for vps_id, vps in zip(self.vps_ids, self.vps_data)}
+        groups = {}
+        for vps_id, vps in zip(self.vps_ids, self.vps_data):
+            groups.setdefault(new_shard_of[vps_id], []).append(vps)
+
+        old_keys = set(self.shard_of.values())
+        if changes is None or not self.shard_of:
+            dirty = set(groups)
+        else:
+            dirty = set()
+            for change in changes:
+                dirty.add(self.shard_of.get(change[1]))
+                dirty.add(new_shard_of.get(change[1]))
+        # 没有被记录过的分片（新出现或文件丢失）也要写
+        dirty |= {key for key in groups if not os.path.exists(shard_path(key))}
+
+        os.makedirs(os.path.dirname(shard_path('_')), exist_ok=True)
+        for key in dirty:
+            if key in groups:
+                atomic_write(shard_path(key), render_shard(key, groups[key]))
+        for key in old_keys - set(groups):
+            try:
+                os.remove(shard_path(key))
+            except OSError:
+                pass
+
+        if set(groups) != old_keys or changes is None or not self.shard_of:
+            old_scripts = self.dashboard_scripts()
+            head, tail = self.dashboard_template
+            pos = tail.rfind('</body>')
+            pos = len(tail) if pos < 0 else pos
+            scripts = render_scripts([shard_path(key) for key in sorted(groups)])
+            atomic_write(self.vps_file, head + 'vpsServices = []' + tail[:pos] + scripts + tail[pos:])
+            # 页面之前引用、现在不再需要的分片文件（如旧的文件名）
+            base = os.path.dirname(os.path.abspath(self.vps_file))
+            for path in set(old_scripts) - set(self.shard_scripts(groups)):
+                if not path.startswith(SHARD_DIR + '/'):
+                    continue
+                try:
+                    os.remove(os.path.join(base, path))
+                except OSError:
+                    pass
+            # 分片模式的页面在浏览器中计算，删除之前生成的分页文件
+            write_pages({}, PAGE_DIR)
+            self.remember_dashboard()
+        self.shard_of = new_shard_of
+
+    def queue_put(self, idx, action='修改'):
+        self.pending_changes.append(('put', self.vps_ids[idx], self.vps_data[idx]))
+        self.pending_events.append((action, self.vps_data[idx].name))
+
+    def queue_delete(self, vps_id, name):
+        self.pending_changes.append(('delete', vps_id))
+        self.pending_events.append(('删除', name))
+
+    @contextmanager
+    def batch(self):
+        """批量修改：期间的保存只记录在内存中，结束时一次性写入"""
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.commit()
+
+    def save_vps_data(self):
+        if self.batch_depth:
+            print(f"\n已暂存 (共 {len(self.pending_changes)} 项未保存修改，退出或推送时统一保存)")
+            return
+        self.commit()
+
+    def commit(self):
+        """在一个事务中写入所有暂存修改，并只重新生成一次 index.html"""
+        if not self.pending_changes:
+            if self.rerender_pending:
+                try:
+                    self.render_dashboard()
+                    self.rerender_pending = False
+                except Exception as e:
+                    print(f"\n重新生成页面失败: {e}")
+            return False
+        changes, self.pending_changes = self.pending_changes, []
+        events, self.pending_events = self.pending_events, []
+        try:
+            self.store.apply(changes)
+            self.render_dashboard(changes)
+            self.rerender_pending = False
+            print(f"\n保存成功！({len(changes)} 项修改)")
+            self.change_notices.add(*events)
+            return True
             
         except Exception as e:
+            self.pending_changes = changes + self.pending_changes
+            self.pending_events = events + self.pending_events
             print(f"\n保存失败: {e}")
+            return False
+
+    def send_change_summary(self, events):
+        """把一段时间内的所有修改汇总成一条通知"""
+        grouped = {}
+        for action, name in events:
+            names = grouped.setdefault(action, {})
+            names[name] = names.get(name, 0) + 1
+
+        message = "VPS信息已更新\n"
+        message += f"更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        message += f"当前监控: {len(self.vps_data)}台服务器\n"
+        for action, names in grouped.items():
+            items = [name if count == 1 else f"{name} (×{count})" for name, count in names.items()]
+            if len(items) > 10:
+                # 批量导入时只列出前几台
+                items = items[:10] + [f"等 {len(items)} 台"]
+            message += f"\n{action}: {', '.join(items)}"
+        self.send_notification(message)
+
+    def upsert_records(self, records, replace=False):
+        """批量导入：同名的VPS更新，其余添加；replace 时先删除所有现有VPS。返回 (添加数, 更新数)
+
+        只加入暂存队列，配合 batch() 使用时整批只写入一次
+        """
+        if replace:
+            for vps_id, vps in zip(self.vps_ids, self.vps_data):
+                self.due_index.remove(vps)
+                self.costs.remove(vps)
+                self.queue_delete(vps_id, vps.name)
+            self.vps_data, self.vps_ids = [], []
+        positions = {vps.name: idx for idx, vps in enumerate(self.vps_data)}
+        added = updated = 0
+        for record in records:
+            idx = positions.get(record.name)
+            if idx is None:
+                self.vps_data.append(record)
+                self.vps_ids.append(self.next_id)
+                self.next_id += 1
+                self.due_index.add(record)
+                self.costs.add(record)
+                idx = positions[record.name] = len(self.vps_data) - 1
+                self.queue_put(idx, '导入')
+                added += 1
+            else:
+                old = self.vps_data[idx]
+                self.due_index.remove(old)
+                self.costs.remove(old)
+                self.vps_data[idx] = record
+                self.due_index.add(record)
+                self.costs.add(record)
+                self.queue_put(idx)
+                updated += 1
+        return added, updated
 
     def display_currencies(self):
         print("\n可选币种:")
@@ -208,19 +469,19 @@ class VPSManager:
         print(f"{'#':<3}{'Name':<20}{'Cost':<15}{'Billing':<20}{'Next Due Date':<15}{'URL':<25}")
         print("-" * 100)
         for i, vps in enumerate(self.vps_data, 1):
-            currency_name = self.currency_names.get(vps['currency'], vps['currency'])
-            cost_info = f"{vps['cost']} {vps['currency']} ({currency_name})"
+            currency_name = self.currency_names.get(vps.currency, vps.currency)
+            cost_info = f"{vps.cost} {vps.currency} ({currency_name})"
             
             # Handle both new and old data formats for display
-            if 'billingCycle' in vps and 'nextDueDate' in vps:
-                cycle_display = self.billing_cycles.get(vps['billingCycle'], vps['billingCycle'])
+            if not vps.is_legacy:
+                cycle_display = self.billing_cycles.get(vps.billing_cycle, vps.billing_cycle)
                 billing_info = f"{cycle_display}"
-                due_date_info = vps['nextDueDate']
+                due_date_info = format_date(vps.next_due)
             else: # Fallback for old format
                 billing_info = "旧格式(请修改)"
-                due_date_info = vps.get('expireDate', f"每月{vps.get('monthlyExpireDay')}日")
+                due_date_info = format_date(vps.due) if vps.due is not None else f"每月{vps.monthly_day}日"
 
-            print(f"{i:<3}{vps['name']:<20}{cost_info:<15}{billing_info:<20}{due_date_info:<15}{vps.get('url', ''):<25}")
+            print(f"{i:<3}{vps.name:<20}{cost_info:<15}{billing_info:<20}{due_date_info:<15}{vps.url or '':<25}")
         print("-" * 100)
 
     def edit_vps(self):
@@ -236,54 +497,57 @@ class VPSManager:
                 return
 
             vps = self.vps_data[idx]
-            print(f"\n正在修改: {vps['name']}")
+            print(f"\n正在修改: {vps.name}")
             print("直接回车保持原值")
             
             changes = {}
             
-            name = input(f"Name ({vps['name']}): ")
+            name = input(f"Name ({vps.name}): ")
             if name: changes['name'] = name.strip()
             
-            cost_str = input(f"费用 ({vps['cost']}): ")
+            cost_str = input(f"费用 ({vps.cost}): ")
             if cost_str:
                 try:
                     changes['cost'] = float(cost_str)
                 except ValueError:
                     print("费用格式无效，保持原值")
             
-            new_currency = self.select_currency(vps['currency'])
-            if new_currency and new_currency != vps['currency']:
+            new_currency = self.select_currency(vps.currency)
+            if new_currency and new_currency != vps.currency:
                 changes['currency'] = new_currency
             
             # --- New Billing Logic ---
             # Check if using old format and force update
-            is_old_format = 'billingCycle' not in vps or 'nextDueDate' not in vps
-            if is_old_format:
+            if vps.is_legacy:
                 print("\n检测到旧的日期格式，请更新为新的计费方式。")
-                current_cycle = None
-                current_due_date = vps.get('expireDate', 'N/A')
+                current_cycle = vps.billing_cycle
+                current_due_date = format_date(vps.due) if vps.due is not None else 'N/A'
             else:
-                current_cycle = vps.get('billingCycle')
-                current_due_date = vps.get('nextDueDate')
+                current_cycle = vps.billing_cycle
+                current_due_date = format_date(vps.next_due)
 
             new_cycle = self.select_billing_cycle(current_cycle)
             if new_cycle:
-                changes['billingCycle'] = new_cycle
+                changes['billing_cycle'] = new_cycle
 
             new_due_date_str = input(f"到期时间 (YYYY-MM-DD) ({current_due_date}): ")
             if new_due_date_str:
-                try:
-                    datetime.strptime(new_due_date_str, '%Y-%m-%d')
-                    changes['nextDueDate'] = new_due_date_str
-                except ValueError:
+                next_due = parse_date(new_due_date_str)
+                if next_due is not None:
+                    changes['next_due'] = next_due
+                else:
                     print("日期格式无效 (应为 YYYY-MM-DD)，保持原值")
             
-            url = input(f"URL ({vps.get('url', '')}): ")
+            url = input(f"URL ({vps.url or ''}): ")
             if url: changes['url'] = url
 
             if changes:
-                vps.update(changes)
-                self.vps_data[idx] = vps
+                old_due = vps.due
+                for field, value in changes.items():
+                    setattr(vps, field, value)
+                self.due_index.update(vps, old_due)
+                self.costs.update(vps)
+                self.queue_put(idx)
                 self.save_vps_data()
                 print("\n修改成功！")
             else:
@@ -313,27 +577,29 @@ class VPSManager:
             if not billing_cycle:
                 print("必须选择一个计费时段!"); return
 
-            next_due_date = ""
-            while not next_due_date:
-                date_str = input("到期时间 (YYYY-MM-DD): ")
-                try:
-                    datetime.strptime(date_str, '%Y-%m-%d')
-                    next_due_date = date_str
-                except ValueError:
+            next_due = None
+            while next_due is None:
+                next_due = parse_date(input("到期时间 (YYYY-MM-DD): "))
+                if next_due is None:
                     print("无效的日期格式，请重新输入！")
             
             url = input("Management URL: ")
             
-            new_vps = {
-                'name': name,
-                'cost': cost,
-                'currency': currency,
-                'billingCycle': billing_cycle,
-                'nextDueDate': next_due_date,
-                'url': url
-            }
+            new_vps = VPSRecord(
+                name=name,
+                cost=cost,
+                currency=currency,
+                billing_cycle=billing_cycle,
+                next_due=next_due,
+                url=url
+            )
             
             self.vps_data.append(new_vps)
+            self.due_index.add(new_vps)
+            self.costs.add(new_vps)
+            self.vps_ids.append(self.next_id)
+            self.next_id += 1
+            self.queue_put(len(self.vps_data) - 1, '添加')
             self.save_vps_data()
             print("\n添加成功！")
             
@@ -350,7 +616,10 @@ class VPSManager:
             idx = int(idx_str) - 1
             if 0 <= idx < len(self.vps_data):
                 vps = self.vps_data.pop(idx)
-                print(f"\n已删除: {vps['name']}")
+                self.due_index.remove(vps)
+                self.costs.remove(vps)
+                self.queue_delete(self.vps_ids.pop(idx), vps.name)
+                print(f"\n已删除: {vps.name}")
                 self.save_vps_data()
             else:
                 print("无效的序号！")
@@ -359,6 +628,8 @@ class VPSManager:
 
     def push_to_github(self):
         try:
+            self.commit()
+            self.change_notices.flush()
             os.system('git add .')
             commit_message = f'Update VPS data: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
             os.system(f'git commit -m "{commit_message}"')
@@ -371,11 +642,13 @@ class VPSManager:
         while True:
             print("\n=== 通知设置 ===")
             print("1. 配置Telegram通知")
-            print("2. 发送测试通知")
+            print("2. 配置钉钉通知")
+            print("3. 发送测试通知")
             print("0. 返回主菜单")
             choice = input("\n请选择操作: ")
             if choice == '1': self.notification.setup_telegram()
-            elif choice == '2': self.send_test_notification()
+            elif choice == '2': self.notification.setup_dingtalk()
+            elif choice == '3': self.send_test_notification()
             elif choice == '0': break
             else: print("无效的选择！")
 
@@ -384,68 +657,115 @@ class VPSManager:
         message += f"当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
         message += f"监控服务器数量: {len(self.vps_data)} 台"
         
-        results = []
-        if self.notification.config['telegram']['enabled']:
-            self.notification.send_telegram(message)
-            results.append("Telegram: 已发送")
-        
+        results = self.notification.notify(message)
         if not results: print("未启用任何通知方式！")
-        else: print("\n".join(results))
+        else: print("\n".join(f"{channel.name}: {'发送失败' if error else '已发送'}" for channel, _, error in results))
 
-    def check_expiring_vps(self):
-        expiring_vps = []
+    def check_expiring_vps(self, days=3):
         today = datetime.now()
-        for vps in self.vps_data:
-            # Use new 'nextDueDate' field, with fallback to 'expireDate' for old data
-            due_date_str = vps.get('nextDueDate') or vps.get('expireDate')
-            if not due_date_str:
-                continue
-
-            try:
-                expire_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-                days_left = (expire_date - today).days
-                if 0 < days_left <= 3:
-                    expiring_vps.append(f"<b>{vps['name']}</b>: 还有 {days_left} 天到期 ({vps['nextDueDate']})")
-            except ValueError:
-                continue # Skip malformed dates
+        today_ord = today_ordinal()
+        # Range lookup on the due-date index instead of scanning every server
+        alerts = [(vps, vps.days_left(today_ord)) for vps in self.due_index.due_within(today_ord, days)]
+        # 与 vps_monitor 共用提醒记录，已经提醒过的不再重复发送
+        ledger = AlertLedger()
+        alerts = ledger.unsent(alerts, today_ord)
         
-        if expiring_vps:
+        if alerts:
             message = "VPS到期提醒\n"
             message += f"当前时间: {today.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            message += "\n".join(expiring_vps)
-            self.send_notification(message)
+            message += "\n".join(
+                f"<b>{vps.name}</b>: 还有 {days_left} 天到期 ({format_date(vps.due)})"
+                for vps, days_left in alerts
+            )
+            results = self.notification.notify(message, "VPS到期提醒")
+            if any(error is None for _, _, error in results):
+                ledger.mark(alerts, today_ord)
+        ledger.save(today_ord)
+
+    def roll_forward_due_dates(self):
+        """Advance every passed nextDueDate by its billing cycle to today or later."""
+        today = today_ordinal()
+        rolled = []
+        for vps in self.due_index.between(None, today - 1):
+            if vps.is_legacy:
+                continue
+            old_due = vps.due
+            vps.next_due = next_due_after(vps.next_due, vps.billing_cycle, today)
+            if vps.next_due != old_due:
+                self.due_index.update(vps, old_due)
+                rolled.append(vps)
+        if rolled:
+            positions = {id(vps): idx for idx, vps in enumerate(self.vps_data)}
+            for vps in rolled:
+                self.queue_put(positions[id(vps)], '顺延')
+            print(f"\n已按计费周期顺延 {len(rolled)} 台VPS的到期日")
+        return len(rolled)
+
+    def renewal_calendar(self, years=3):
+        return RenewalCalendar(self.vps_data, today_ordinal(), years)
+
+    def show_renewal_calendar(self, months=3):
+        today = today_ordinal()
+        entries = self.renewal_calendar().between(today, add_months(today, months) - 1)
+        if not entries:
+            print(f"\n未来{months}个月没有需要续费的VPS")
+            return
+        print(f"\n=== 未来{months}个月续费日历 ===")
+        print("-" * 60)
+        current_month = None
+        for due, vps in entries:
+            due_str = format_date(due)
+            if due_str[:7] != current_month:
+                current_month = due_str[:7]
+                print(f"\n[{current_month}]")
+            cycle_display = self.billing_cycles.get(vps.billing_cycle, vps.billing_cycle or '每月')
+            print(f"  {due_str}  {vps.name:<30} {vps.cost} {vps.currency} ({cycle_display})")
+        print("-" * 60)
 
-    def send_notification(self, message):
-        if self.notification.config['telegram']['enabled']:
-            self.notification.send_telegram(message)
+    def send_notification(self, message, title='VPS通知'):
+        self.notification.notify(message, title)
 
-    def update_exchange_rates(self):
+    def update_exchange_rates(self, force=False):
         try:
             print("\n正在更新汇率...")
-            base_currency = 'CNY'
-            api_url = f"https://api.exchangerate-api.com/v4/latest/{base_currency}"
-            rates_data = None
+            # 同时请求所有数据源，采用最先返回且数据合理的结果；必须包含清单中用到的币种
+            self.rate_cache.required = sorted({vps.currency for vps in self.vps_data})
             try:
-                response = requests.get(api_url, timeout=10)
-                response.raise_for_status()
-                rates_data = response.json()
+                rates, source = self.rate_cache.get(force)
             except Exception as e:
-                print(f"API {api_url} 失败: {str(e)}")
-            
-            if not rates_data or 'rates' not in rates_data:
+                print(f"{str(e)}")
                 print("API获取失败，无法更新汇率。")
                 return False
 
-            self.exchange_rates = rates_data['rates']
-            
-            js_content = f"// 汇率数据 - 相对于人民币(CNY) - 更新时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            js_content += f"const exchangeRates = {json.dumps(self.exchange_rates, indent=4, ensure_ascii=False)};\n\n"
-            js_content += f"// 币种中文名称映射\n"
-            js_content += f"const currencyNames = {json.dumps(self.currency_names, indent=4, ensure_ascii=False)};\n"
-            
-            with open('exchange_rates.js', 'w', encoding='utf-8') as f:
-                f.write(js_content)
-            
+            self.exchange_rates = rates
+            updated = source not in ('cache', 'not-modified', 'stale')
+            if not updated:
+                fetched_at = datetime.fromtimestamp(self.rate_cache.cached()['fetched_at'])
+                hint = {
+                    'cache': "缓存未过期，未请求API",
+                    'not-modified': "API返回汇率未变化",
+                    'stale': "API获取失败，使用旧的缓存"
+                }[source]
+                print(f"{hint} (汇率更新于 {fetched_at.strftime('%Y-%m-%d %H:%M:%S')})")
+            
+            # 只输出可选币种和清单中用到的币种；内容没变时不改写文件，避免无意义的提交
+            js_content = rates_js(
+                self.exchange_rates, self.currency_names,
+                set(self.currencies) | {vps.currency for vps in self.vps_data},
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
+            written = write_rates_js('exchange_rates.js', js_content, self.notification.config.get('exchange_rates_gzip', False))
+            print("已更新 exchange_rates.js" if written else "exchange_rates.js 没有变化")
+            if not updated:
+                return source != 'stale'
+            if not self.shard_by:
+                # 页面中预先计算的人民币单价和统计使用新的汇率；批量修改期间还有未写入数据库的修改，
+                # 页面在 commit() 时与数据一起重新生成，不能提前写出未保存的修改
+                if self.batch_depth:
+                    self.rerender_pending = True
+                else:
+                    self.render_dashboard()
+
             print("\n当前汇率（相对于CNY）：")
             print("-" * 50)
             for i, (currency, rate) in enumerate(self.exchange_rates.items(), 1):
@@ -463,7 +783,9 @@ class VPSManager:
             for currency in ['USD', 'EUR', 'HKD', 'JPY', 'GBP']:
                 if currency in self.exchange_rates:
                     message += f"{currency}: {self.exchange_rates[currency]:.4f}\n"
-            self.send_notification(message)
+            print(f"汇率来源: {source}")
+            if written:
+                self.send_notification(message)
             print("\n汇率更新成功！")
             return True
             
@@ -473,51 +795,57 @@ class VPSManager:
 
     def show_currency_stats(self):
         if not self.exchange_rates:
-            print("\n请先运行 '7. 更新汇率' 来获取汇率数据。")
+            print("\n没有缓存的汇率数据，请先运行 '7. 更新汇率' 来获取汇率数据。")
             return
         if not self.vps_data:
             print("暂无VPS数据！")
             return
         
-        currency_stats = {}
-        total_cost_cny = 0
-        
-        for vps in self.vps_data:
-            currency = vps['currency']
-            cost = vps['cost']
-            
-            if currency not in currency_stats:
-                currency_stats[currency] = {'count': 0, 'total_cost': 0}
-            
-            currency_stats[currency]['count'] += 1
-            currency_stats[currency]['total_cost'] += cost
-            
-            rate_to_cny = self.exchange_rates.get(currency)
-            if rate_to_cny:
-                total_cost_cny += cost / rate_to_cny
+        # 分组累计值随增删改维护，这里只遍历分组
+        currency_stats = self.costs.totals('currency')
+        converted = self.costs.converted(self.exchange_rates, 'currency')
         
         print("\n=== 货币使用统计 ===")
-        print("-" * 60)
-        print(f"{'币种':<8} {'中文名':<12} {'数量':<6} {'总费用':<15} {'人民币约':<12}")
-        print("-" * 60)
+        print("-" * 72)
+        print(f"{'币种':<8} {'中文名':<12} {'数量':<6} {'总费用':<12} {'每月':<12} {'人民币/月':<12}")
+        print("-" * 72)
         
-        for currency, stats in sorted(currency_stats.items()):
+        for currency, (count, total, monthly) in sorted(currency_stats.items()):
             name = self.currency_names.get(currency, currency)
-            count = stats['count']
-            total = stats['total_cost']
-            
-            rate_to_cny = self.exchange_rates.get(currency)
-            cny_equivalent = (total / rate_to_cny) if rate_to_cny else 0
-            
-            print(f"{currency:<8} {name:<12} {count:<6} {total:<15.2f} {cny_equivalent:<12.2f}")
+            cny_monthly = converted.get(currency, (0, 0.0, 0.0))[1]
+            print(f"{currency:<8} {name:<12} {count:<6} {total:<12.2f} {monthly:<12.2f} {cny_monthly:<12.2f}")
         
-        print("-" * 60)
-        print(f"总计: {len(self.vps_data)} 台服务器，约 {total_cost_cny:.2f} CNY")
-        print("-" * 60)
+        print("-" * 72)
+        print("\n按计费周期（人民币）:")
+        for cycle, (count, monthly, yearly) in sorted(self.costs.converted(self.exchange_rates, 'billing_cycle').items(),
+                                                      key=lambda item: -item[1][1]):
+            cycle_display = self.billing_cycles.get(cycle, cycle or '旧格式')
+            print(f"  {cycle_display:<10} {count:>4} 台  每月约 {monthly:>10.2f}  每年约 {yearly:>10.2f}")
+        print("\n按服务商（人民币）:")
+        for provider, (count, monthly, yearly) in sorted(self.costs.converted(self.exchange_rates, 'provider').items(),
+                                                         key=lambda item: -item[1][1]):
+            print(f"  {provider:<24} {count:>4} 台  每月约 {monthly:>10.2f}  每年约 {yearly:>10.2f}")
+        
+        total_monthly = sum(monthly for _, monthly, _ in converted.values())
+        print("-" * 72)
+        print(f"总计: {len(self.vps_data)} 台服务器，每月约 {total_monthly:.2f} CNY，每年约 {total_monthly * 12:.2f} CNY")
+        missing = self.costs.missing_rates(self.exchange_rates)
+        if missing:
+            print(f"以下币种没有汇率，未计入: {', '.join(missing)}")
+        print("-" * 72)
 
     def show_menu(self):
-        # Automatically check for expiring VPS on start
-        self.check_expiring_vps()
+        try:
+            with self.batch():
+                # Roll passed due dates forward, then check for expiring VPS on start
+                self.roll_forward_due_dates()
+                self.check_expiring_vps()
+                self.menu_loop()
+        finally:
+            # 退出时发送尚未发出的修改通知
+            self.change_notices.flush()
+
+    def menu_loop(self):
         while True:
             os.system('cls' if os.name == 'nt' else 'clear')
             print("\n=== VPS到期监控 (已优化计费方式) ===")
@@ -530,7 +858,11 @@ class VPSManager:
             print("6. 通知设置")
             print("7. 更新汇率")
             print("8. 货币统计")
+            print("9. 立即保存")
+            print("10. 续费日历")
             print("0. 退出")
+            if self.pending_changes:
+                print(f"\n(有 {len(self.pending_changes)} 项修改尚未保存，退出时自动保存)")
             print()
             print("=" * 38)
             
@@ -544,6 +876,9 @@ class VPSManager:
             elif choice == '6': self.notification_menu()
             elif choice == '7': self.update_exchange_rates()
             elif choice == '8': self.show_currency_stats()
+            elif choice == '9':
+                if not self.commit(): print("没有需要保存的修改")
+            elif choice == '10': self.show_renewal_calendar()
             elif choice == '0': break
             else: print("无效的选择！")
             
@@ -551,6 +886,10 @@ class VPSManager:
                 input("\n按回车键继续...")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 带参数时为命令行模式：import / export / list / check
+        import vps_cli
+        sys.exit(vps_cli.main(sys.argv[1:]))
     try:
         manager = VPSManager()
         manager.show_menu()
@@ -1,72 +1,143 @@
 import json
 import os
+import sys
 import logging
-from datetime import datetime
 import requests
+from alert_ledger import AlertLedger
+from log_setup import setup_logging
+from monitor_daemon import next_alert_day, run_daemon, wake_time
+from run_metrics import METRICS_DIR, RunMetrics
+from vps_billing import monthly_due
 from vps_manager import VPSManager
+from vps_record import format_date, today_ordinal
+from vps_shards import ShardEvaluator, group_records
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='vps_monitor.log'
-)
+# 剩余1~3天时提醒
+ALERT_MIN_DAYS = 1
+ALERT_MAX_DAYS = 3
 
-def check_vps_expiry():
-    """检查VPS到期情况并发送通知"""
+def check_vps_expiry(row_cache=None, evaluator=None):
+    """检查VPS到期情况并发送通知，返回载入数据的 VPSManager（出错时为 None）
+
+    常驻模式传入上一次的 row_cache 和 evaluator：只解析有变化的行，只重新计算有变化的分片。
+    各阶段耗时、扫描和提醒数量、HTTP请求写入 metrics/vps_monitor.prom 和 metrics/vps_monitor.jsonl
+    """
+    manager = None
+    evaluator = evaluator or ShardEvaluator()
+    metrics = RunMetrics('vps_monitor').start()
     try:
-        manager = VPSManager()
+        metrics.begin('load')
+        manager = VPSManager(row_cache)
+        metrics.directory = manager.notification.config.get('metrics_dir', METRICS_DIR)
+        metrics.set('records_scanned', len(manager.vps_data))
+        metrics.begin('evaluate')
+        ledger = AlertLedger()
         expiring_vps = []
         monthly_vps = []
 
-        # 检查所有VPS
-        for vps in manager.vps_data:
-            if 'expireDate' in vps:
-                expire_date = datetime.strptime(vps['expireDate'], '%Y-%m-%d')
-                days_left = (expire_date - datetime.now()).days
-                if 0 < days_left <= 3:
-                    expiring_vps.append(f"• {vps['name']}: {days_left}天后到期 ({vps['expireDate']})")
-            elif 'monthlyExpireDay' in vps:
-                today = datetime.now()
-                expire_day = vps['monthlyExpireDay']
-                days_until_expire = expire_day - today.day
-                
-                next_month = today.replace(day=1)
-                if today.day >= expire_day:
-                    next_month = next_month.replace(month=today.month + 1)
-                next_pay_date = next_month.replace(day=expire_day)
-                
-                if days_until_expire <= 3 and days_until_expire > 0:
-                    monthly_vps.append(f"• {vps['name']}: {days_until_expire}天后续费 ({next_pay_date.strftime('%Y-%m-%d')})")
-                elif days_until_expire <= 0:
-                    days_until_expire = expire_day
-                    monthly_vps.append(f"• {vps['name']}: {days_until_expire}天后续费 ({next_pay_date.strftime('%Y-%m-%d')})")
+        # 有具体到期日的VPS整批计算剩余天数（有 NumPy 时向量化）
+        today_ord = today_ordinal()
+        # 分片模式：各分片在进程池中并行计算，再合并结果；不分片时整个清单作为一个分片
+        if manager.shard_by:
+            shards = group_records(manager.vps_data, manager.shard_by)
+        else:
+            shards = {None: manager.vps_data}
+        expiring, buckets, currency_totals = evaluator.evaluate(shards, today_ord, ALERT_MIN_DAYS, ALERT_MAX_DAYS)
+        expiring_vps = [(vps, days_left) for vps, days_left, _ in expiring]
+        metrics.set('shards_evaluated', evaluator.evaluated)
+        if manager.shard_by:
+            metrics.set('shards', len(shards))
+            logging.info(f"扫描 {len(shards)} 个分片共 {len(manager.vps_data)} 台VPS（重新计算 {evaluator.evaluated} 个分片），"
+                         f"剩余天数分布: {buckets}，币种统计: {currency_totals}")
+        else:
+            logging.info(f"扫描 {len(manager.vps_data)} 台VPS，剩余天数分布: {buckets}")
+
+        # 旧格式的每月续费日（跨年、小月按月末处理）
+        for vps in manager.due_index.undated:
+            if vps.monthly_day is not None:
+                next_pay_date = monthly_due(vps.monthly_day, today_ord + 1)
+                days_until_expire = next_pay_date - today_ord
+                if days_until_expire <= ALERT_MAX_DAYS:
+                    monthly_vps.append((vps, days_until_expire))
+
+        # 已经提醒过的（同一到期日、同一剩余天数）不再重复发送
+        metrics.set('alerts_due', len(expiring_vps) + len(monthly_vps))
+        expiring_vps = ledger.unsent(expiring_vps, today_ord)
+        monthly_vps = ledger.unsent(monthly_vps, today_ord)
+        metrics.set('alerts_new', len(expiring_vps) + len(monthly_vps))
+        metrics.set('alerts_sent', 0)
 
-        # 如果有即将到期的VPS，发送通知
+        # 如果有新的到期提醒，发送通知
         if expiring_vps or monthly_vps:
             message = "⚠️ VPS到期提醒\n"
             
             if expiring_vps:
-                message += "\n" + "\n".join(expiring_vps)
+                message += "\n" + "\n".join(
+                    f"• {vps.name}: {days_left}天后到期 ({format_date(vps.due)})"
+                    for vps, days_left in expiring_vps
+                )
             
             if monthly_vps:
                 if expiring_vps:
                     message += "\n"
-                message += "\n" + "\n".join(monthly_vps)
+                message += "\n" + "\n".join(
+                    f"• {vps.name}: {days_left}天后续费 ({format_date(today_ord + days_left)})"
+                    for vps, days_left in monthly_vps
+                )
             
-            # 发送Telegram通知
-            if manager.notification.config['telegram']['enabled']:
-                manager.notification.send_telegram(message)
-                print("已发送到期提醒通知")
-                logging.info("已发送到期提醒通知")
+            # 同时发送到所有已启用的通知通道，至少一个通道成功才记为已提醒
+            if manager.notification.channels():
+                metrics.begin('notify')
+                results = manager.notification.notify(message, "VPS到期提醒")
+                for channel, _, error in results:
+                    if error is not None:
+                        metrics.error(f'notify:{channel.name}')
+                if any(error is None for _, _, error in results):
+                    ledger.mark(expiring_vps + monthly_vps, today_ord)
+                    metrics.set('alerts_sent', len(expiring_vps) + len(monthly_vps))
+                    print("已发送到期提醒通知")
+                    logging.info("已发送到期提醒通知")
         else:
-            print("没有即将到期的VPS")
-            logging.info("没有即将到期的VPS")
+            print("没有新的到期提醒")
+            logging.info("没有新的到期提醒")
+        ledger.save(today_ord)
 
     except Exception as e:
+        metrics.fail()
         error_msg = f"检查过程出错: {str(e)}"
         print(error_msg)
         logging.error(error_msg)
+    metrics.finish().write()
+    logging.info(f"检查耗时 {metrics.duration:.3f}s", extra={'stages': metrics.to_dict()['stages']})
+    return manager
+
+def run_forever():
+    """常驻模式：休眠到下一次有新提醒的日期，index.html 或数据存储被修改时立即重新检查
+
+    各次检查之间保留已解析的行和各分片的计算结果，重新检查时只解析有变化的行、只重新计算有变化的分片
+    """
+    state = {}
+    row_cache = {}
+    evaluator = ShardEvaluator()
+
+    def check():
+        state['manager'] = check_vps_expiry(row_cache, evaluator)
+
+    def next_wake():
+        manager = state.get('manager')
+        if manager is None:
+            raise RuntimeError("载入VPS数据失败")
+        day = next_alert_day(manager.due_index, today_ordinal() + 1, ALERT_MAX_DAYS, ALERT_MIN_DAYS)
+        return wake_time(day) if day is not None else None
+
+    print("VPS到期监控已启动（常驻模式）")
+    logging.info("VPS到期监控启动（常驻模式）")
+    run_daemon(check, next_wake, ['index.html', 'vps_data.db'])
 
 if __name__ == "__main__":
-    check_vps_expiry() 
\ No newline at end of file
+    # 日志写入 logs/vps_monitor.log（JSON Lines，后台线程写入，自动轮转）
+    setup_logging('vps_monitor')
+    if '--daemon' in sys.argv[1:]:
+        run_forever()
+    else:
+        check_vps_expiry() 
\ No newline at end of file
@@ -0,0 +1,153 @@
+import re
+from json.decoder import JSONDecodeError, JSONDecoder, scanstring
+
+# 只用于定位数组起点，之后的内容逐字符单遍扫描；也支持分片文件中的 vpsShards["..."] = [...]
+DECLARATION_RE = re.compile(r'\bvps(?:Services|Shards\[[^\]\n]*\])\s*=\s*\[')
+SKIP_RE = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)+', re.S)
+NUMBER_RE = re.compile(r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+IDENT_RE = re.compile(r'[A-Za-z_$][\w$]*')
+SINGLE_QUOTED_RE = re.compile(r"'((?:[^'\\]|\\.)*)'", re.S)
+SINGLE_ESCAPE_RE = re.compile(r"\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|.)", re.S)
+SURROGATE_RE = re.compile('[\ud800-\udfff]')
+LITERALS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+JSON_DECODER = JSONDecoder()
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+           # 反斜杠加换行是续行，不产生字符
+           '\n': '', '\r': '', '\r\n': '', '\u2028': '', '\u2029': ''}
+
+
+def _unescape(match):
+    """单引号字符串中的转义：\\uXXXX、\\u{X...}、\\xXX 和单字符转义"""
+    escape = match.group(1)
+    if escape[0] in 'ux' and len(escape) > 1:
+        code = int(escape[2:-1] if escape[1] == '{' else escape[1:], 16)
+        return chr(code) if code <= 0x10FFFF else escape
+    return ESCAPES.get(escape, escape)
+
+
+class JSParseError(ValueError):
+    pass
+
+
+class VPSServicesNotFound(JSParseError):
+    pass
+
+
+class _Scanner:
+    """JS对象字面量的单遍扫描器：支持注释、单/双引号、无引号键名、嵌套和尾随逗号"""
+
+    def __init__(self, text, pos):
+        self.text = text
+        self.pos = pos
+        # JSONDecodeError 会统计行号(O(n))，页面不是标准JSON时就不再尝试快速路径
+        self.try_json = True
+
+    def error(self, message):
+        raise JSParseError(f"{message} (位置 {self.pos}: {self.text[self.pos:self.pos + 20]!r})")
+
+    def skip(self):
+        match = SKIP_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+        return self.text[self.pos:self.pos + 1]
+
+    def string(self, quote):
+        if quote == '"':
+            value, self.pos = scanstring(self.text, self.pos + 1)
+            return value
+        match = SINGLE_QUOTED_RE.match(self.text, self.pos)
+        if not match:
+            self.error("字符串未闭合")
+        self.pos = match.end()
+        value = SINGLE_ESCAPE_RE.sub(_unescape, match.group(1))
+        if SURROGATE_RE.search(value):
+            # '\ud83d\ude00' 这样的代理对合并为一个字符
+            value = value.encode('utf-16', 'surrogatepass').decode('utf-16', 'replace')
+        return value
+
+    def key(self):
+        ch = self.skip()
+        if ch in ('"', "'"):
+            return self.string(ch)
+        match = IDENT_RE.match(self.text, self.pos)
+        if not match:
+            self.error("无效的键名")
+        self.pos = match.end()
+        return match.group(0)
+
+    def value(self):
+        ch = self.skip()
+        if ch in ('{', '[') and self.try_json:
+            # 标准JSON写法（脚本生成的页面）直接交给C实现的解码器，失败再逐个token解析
+            try:
+                value, self.pos = JSON_DECODER.raw_decode(self.text, self.pos)
+                return value
+            except JSONDecodeError:
+                self.try_json = False
+        if ch == '{':
+            return self.object()
+        if ch == '[':
+            self.pos += 1
+            return list(self.items())
+        if ch in ('"', "'"):
+            return self.string(ch)
+        match = NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group(0)
+            return float(number) if any(c in number for c in '.eE') else int(number)
+        match = IDENT_RE.match(self.text, self.pos)
+        if match and match.group(0) in LITERALS:
+            self.pos = match.end()
+            return LITERALS[match.group(0)]
+        self.error("无法识别的值")
+
+    def object(self):
+        self.pos += 1
+        obj = {}
+        while True:
+            if self.skip() == '}':
+                self.pos += 1
+                return obj
+            key = self.key()
+            if self.skip() != ':':
+                self.error("缺少冒号")
+            self.pos += 1
+            obj[key] = self.value()
+            ch = self.skip()
+            if ch == ',':
+                self.pos += 1
+            elif ch != '}':
+                self.error("缺少逗号")
+
+    def items(self):
+        """逐个产出数组元素，调用前 pos 已越过 '['"""
+        while True:
+            if self.skip() == ']':
+                self.pos += 1
+                return
+            yield self.value()
+            ch = self.skip()
+            if ch == ',':
+                self.pos += 1
+            elif ch != ']':
+                self.error("缺少逗号")
+
+
+def iter_vps_services(text):
+    """在页面文本中定位 vpsServices 数组，逐个产出其中的对象"""
+    match = DECLARATION_RE.search(text)
+    if not match:
+        raise VPSServicesNotFound("未找到 vpsServices 配置")
+    yield from _Scanner(text, match.end()).items()
+
+
+def vps_services_span(text):
+    """返回 `vpsServices = [...]` 在文本中的起止位置，用于替换整个数组"""
+    match = DECLARATION_RE.search(text)
+    if not match:
+        raise VPSServicesNotFound("未找到 vpsServices 配置")
+    scanner = _Scanner(text, match.end())
+    for _ in scanner.items():
+        pass
+    return match.start(), scanner.pos
@@ -0,0 +1,156 @@
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+# 已知字段在JSON中的顺序，其余字段原样保存在 extra 中
+KNOWN_KEYS = ('name', 'cost', 'currency', 'billingCycle', 'nextDueDate',
+              'expireDate', 'monthlyExpireDay', 'url')
+
+
+def parse_date(value):
+    """YYYY-MM-DD -> 日期序数(int)，格式无效时返回 None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        return None
+
+
+def format_date(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class VPSRecord:
+    """一台VPS的紧凑表示：日期只解析一次存为序数，币种和计费周期字符串驻留"""
+
+    __slots__ = ('name', 'cost', 'currency', 'billing_cycle', 'next_due',
+                 'expire', 'monthly_day', 'url', 'extra')
+
+    def __init__(self, name, cost, currency, billing_cycle=None, next_due=None,
+                 url='', expire=None, monthly_day=None, extra=None):
+        self.name = name
+        self.cost = cost
+        self.currency = _intern(currency)
+        self.billing_cycle = _intern(billing_cycle)
+        self.next_due = next_due
+        self.expire = expire
+        self.monthly_day = monthly_day
+        self.url = url
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {key: value for key, value in data.items() if key not in KNOWN_KEYS}
+        monthly_day = data.get('monthlyExpireDay')
+        return cls(
+            name=data['name'],
+            cost=float(data['cost']),
+            currency=data['currency'],
+            billing_cycle=data.get('billingCycle'),
+            next_due=parse_date(data.get('nextDueDate')),
+            url=data.get('url', ''),
+            expire=parse_date(data.get('expireDate')),
+            monthly_day=int(monthly_day) if monthly_day is not None else None,
+            extra=extra or None
+        )
+
+    @property
+    def is_legacy(self):
+        """旧格式（没有 billingCycle + nextDueDate）"""
+        return self.billing_cycle is None or self.next_due is None
+
+    @property
+    def due(self):
+        """到期日序数：优先 nextDueDate，兼容旧的 expireDate"""
+        return self.next_due if self.next_due is not None else self.expire
+
+    def days_left(self, today):
+        """距到期的天数（today 为日期序数），没有具体到期日时返回 None"""
+        due = self.due
+        return None if due is None else due - today
+
+    def to_dict(self):
+        """还原为 index.html 中的JSON结构；新字段齐全时不再输出旧字段"""
+        data = {'name': self.name, 'cost': self.cost, 'currency': self.currency}
+        if self.billing_cycle is not None:
+            data['billingCycle'] = self.billing_cycle
+        if self.next_due is not None:
+            data['nextDueDate'] = format_date(self.next_due)
+        if self.is_legacy:
+            if self.expire is not None:
+                data['expireDate'] = format_date(self.expire)
+            if self.monthly_day is not None:
+                data['monthlyExpireDay'] = self.monthly_day
+        data['url'] = self.url
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"VPSRecord({self.name!r}, {self.cost!r}, {self.currency!r})"
+
+
+class DueIndex:
+    """按到期日排序的索引，区间查询用二分查找；没有具体到期日的旧数据单独存放"""
+
+    def __init__(self, records=()):
+        records = list(records)
+        pairs = sorted(((r.due, r) for r in records if r.due is not None), key=lambda pair: pair[0])
+        self._dues = [due for due, _ in pairs]
+        self._records = [record for _, record in pairs]
+        self.undated = [r for r in records if r.due is None]
+
+    def __len__(self):
+        return len(self._records) + len(self.undated)
+
+    def add(self, record):
+        if record.due is None:
+            self.undated.append(record)
+            return
+        pos = bisect_right(self._dues, record.due)
+        self._dues.insert(pos, record.due)
+        self._records.insert(pos, record)
+
+    def remove(self, record, due=None):
+        """移除记录；记录的日期已被修改时传入修改前的到期日"""
+        due = record.due if due is None else due
+        if due is None:
+            self.undated = [r for r in self.undated if r is not record]
+            return
+        for pos in range(bisect_left(self._dues, due), bisect_right(self._dues, due)):
+            if self._records[pos] is record:
+                del self._dues[pos]
+                del self._records[pos]
+                return
+
+    def update(self, record, old_due):
+        """记录的到期日从 old_due 变更后重新排位"""
+        if old_due is None:
+            self.undated = [r for r in self.undated if r is not record]
+        else:
+            self.remove(record, old_due)
+        self.add(record)
+
+    def between(self, start=None, end=None):
+        """到期日在 [start, end] 之间的记录（日期序数，None 表示不限），按到期日排序"""
+        lo = 0 if start is None else bisect_left(self._dues, start)
+        hi = len(self._dues) if end is None else bisect_right(self._dues, end)
+        return self._records[lo:hi]
+
+    def due_within(self, today, days):
+        """today 之后 1~days 天内到期的记录"""
+        return self.between(today + 1, today + days)
+
+    def earliest(self, start=None):
+        """start 当天或之后最早到期的记录"""
+        pos = 0 if start is None else bisect_left(self._dues, start)
+        return self._records[pos] if pos < len(self._records) else None
@@ -0,0 +1,214 @@
+import hashlib
+import html
+import json
+import os
+import re
+from datetime import date
+
+from vps_billing import monthly_due
+from vps_costs import monthly_cost
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SORTS = ('price_desc', 'price_asc', 'expiry')
+DEFAULT_SORT = 'price_desc'
+# 每页卡片数；不超过 INLINE_LIMIT 台时所有行直接写在 index.html 中，否则按页写到 PAGE_DIR 下按需加载
+PAGE_SIZE = 100
+INLINE_LIMIT = 500
+PAGE_DIR = 'dashboard'
+# 剩余天数不超过这个值时计入“即将到期”，与页面上的说明一致
+EXPIRING_DAYS = 7
+
+CARDS_BEGIN = '<!-- vps-cards -->'
+CARDS_END = '<!-- /vps-cards -->'
+CARDS_RE = re.compile(re.escape(CARDS_BEGIN) + r'.*?' + re.escape(CARDS_END), re.S)
+VIEW_RE = re.compile(r'const vpsView = [^\n]*;')
+RATES_RE = re.compile(r'const exchangeRates = [^\n]*;')
+RATE_ITEM_RE = re.compile(r'''["']([A-Z]{3})["']\s*:\s*([0-9.eE+-]+)''')
+STAT_IDS = ('serverCount', 'totalCost', 'expiringCount')
+EMPTY_HTML = '<p class="text-center p-4">暂无VPS数据。</p>'
+
+
+def day_number(ordinal):
+    """日期序数转为 1970-01-01 起的天数（与页面中的 dayNumber 相同）"""
+    return ordinal - EPOCH_ORDINAL
+
+
+def js_number(value):
+    """与 JS 中数字转字符串的结果相同：100.0 -> 100"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def derive_row(record, rates, cycle_names, today):
+    """页面上一张卡片需要的全部数据：[名称, 地址, 费用, 币种, 计费周期, 月度人民币单价, 到期日(天数)]
+
+    月度单价没有汇率时为 None；旧格式的 expireDate、monthlyExpireDay 也计算到期日
+    """
+    rate = 1 if record.currency == 'CNY' else rates.get(record.currency)
+    monthly = monthly_cost(record) / rate if rate else None
+    due = record.due
+    if due is None and record.monthly_day is not None:
+        due = monthly_due(record.monthly_day, today)
+    cycle = cycle_names.get(record.billing_cycle, record.billing_cycle or '旧格式')
+    return [record.name, record.url or '', js_number(record.cost), record.currency, cycle, monthly,
+            day_number(due) if due is not None else None]
+
+
+def sort_orders(rows):
+    """三种排序的行号列表；与原来页面中的排序相同（稳定排序，没有汇率的按0计算，没有到期日的排在最后）"""
+    ids = range(len(rows))
+    return {
+        'price_desc': sorted(ids, key=lambda i: -(rows[i][5] or 0)),
+        'price_asc': sorted(ids, key=lambda i: rows[i][5] or 0),
+        'expiry': sorted(ids, key=lambda i: (rows[i][6] is None, rows[i][6] or 0))
+    }
+
+
+def badge(due, today):
+    """(状态样式, 文本)：3天内红色、7天内黄色"""
+    if due is None:
+        return 'status-normal', 'N/A'
+    days = due - today
+    status = 'status-danger' if days <= 3 else 'status-warning' if days <= EXPIRING_DAYS else 'status-normal'
+    return status, '已过期' if days < 0 else f'{days} 天'
+
+
+def card_html(row, today):
+    """一张卡片的HTML，与页面中的 cardHTML 相同"""
+    name, url, cost, currency, cycle, monthly, due = row
+    status, text = badge(due, today)
+    name = html.escape(name)
+    due_text = date.fromordinal(due + EPOCH_ORDINAL).isoformat() if due is not None else 'N/A'
+    monthly_text = f'¥{monthly:.2f}' if monthly else 'N/A'
+    return (
+        '<div class="vps-card backdrop-filter">'
+        f'<div class="vps-card-header"><div class="vps-name" title="{name}">'
+        f'<a href="{html.escape(url or "#")}" target="_blank">{name}</a></div></div>'
+        '<div class="vps-card-content"><div class="vps-info-grid">'
+        f'<div><div class="vps-info-label">费用 ({html.escape(cycle)})</div>'
+        f'<div class="vps-info-value">{cost} {html.escape(currency)}</div></div>'
+        f'<div><div class="vps-info-label">月度单价</div><div class="vps-info-value">{monthly_text}</div></div>'
+        f'<div><div class="vps-info-label">到期时间</div><div class="vps-info-value">{due_text}</div></div>'
+        '</div><div class="status-badge-container">'
+        f'<div class="status-badge {status}" data-due="{"" if due is None else due}">{text}</div>'
+        '</div></div></div>\n'
+    )
+
+
+class DashboardView:
+    """生成页面时预先计算好的数据：每张卡片的月度人民币单价和到期日、三种排序、统计值和第一页卡片
+
+    浏览器只需要按页把行数据套进卡片模板；清单较大时各排序的每一页写成单独的文件，翻页时才加载
+    """
+
+    def __init__(self, records, rates, cycle_names, today, page_size=PAGE_SIZE, inline_limit=INLINE_LIMIT):
+        self.today = day_number(today)
+        self.page_size = page_size
+        self.rows = [derive_row(record, rates, cycle_names, today) for record in records]
+        self.orders = sort_orders(self.rows)
+        self.total = sum(row[5] or 0 for row in self.rows)
+        self.dues = [row[6] for row in self.rows if row[6] is not None]
+        self.expiring = sum(1 for due in self.dues if due - self.today <= EXPIRING_DAYS)
+        self.inline = len(self.rows) <= inline_limit
+        self.page_count = max((len(self.rows) + page_size - 1) // page_size, 1)
+
+    def page_rows(self, sort, page):
+        ids = self.orders[sort][page * self.page_size:(page + 1) * self.page_size]
+        return [self.rows[i] for i in ids]
+
+    def first_page_html(self):
+        if not self.rows:
+            return EMPTY_HTML
+        return ''.join(card_html(row, self.today) for row in self.page_rows(DEFAULT_SORT, 0))
+
+    def page_files(self, directory=PAGE_DIR):
+        """{路径: 内容}：每种排序每页一个JS文件（只在不内联时使用）"""
+        if self.inline:
+            return {}
+        return {
+            os.path.join(directory, f'{sort}-{page}.js'):
+                f'vpsPageLoaded({json.dumps(sort)}, {page}, '
+                f'{json.dumps(self.page_rows(sort, page), ensure_ascii=False, separators=(",", ":"))});\n'
+            for sort in SORTS for page in range(self.page_count)
+        }
+
+    def to_dict(self, files=None, directory=PAGE_DIR):
+        view = {
+            'built': self.today,
+            'count': len(self.rows),
+            'total': round(self.total, 2),
+            'expiring': self.expiring,
+            'dues': self.dues,
+            'pageSize': self.page_size,
+            'pageCount': self.page_count,
+            'sort': DEFAULT_SORT
+        }
+        if self.inline:
+            view['rows'] = self.rows
+            view['orders'] = self.orders
+        else:
+            # 页面文件内容变化后换一个版本号，避免浏览器使用缓存的旧文件
+            digest = hashlib.sha1(''.join(sorted(files.values())).encode('utf-8')).hexdigest()[:10] if files else ''
+            view['dir'] = directory.replace(os.sep, '/')
+            view['version'] = digest
+        return view
+
+
+def strip_view(content):
+    """去掉上次生成的预计算数据和卡片，得到页面模板"""
+    content = VIEW_RE.sub('const vpsView = null;', content, count=1)
+    return CARDS_RE.sub(CARDS_BEGIN + CARDS_END, content, count=1)
+
+
+def has_markers(content):
+    return CARDS_BEGIN in content and VIEW_RE.search(content) is not None
+
+
+def page_rates(content):
+    """模板中 exchangeRates 的值（没有缓存的汇率时沿用页面中原有的汇率）"""
+    match = RATES_RE.search(content)
+    return {currency: float(rate) for currency, rate in RATE_ITEM_RE.findall(match.group(0))} if match else {}
+
+
+def apply_view(parts, view, files, rates, directory=PAGE_DIR):
+    """把预计算数据、第一页卡片、统计值和生成时使用的汇率写入页面模板（按数据位置分开的各部分）"""
+    data = json.dumps(view.to_dict(files, directory), ensure_ascii=False, separators=(',', ':'))
+    cards = CARDS_BEGIN + '\n' + view.first_page_html() + CARDS_END
+    # 只写入清单中用到的币种，不把API返回的整张汇率表写进页面
+    used = {row[3] for row in view.rows} | {'CNY'}
+    used_rates = {currency: rate for currency, rate in sorted(rates.items()) if currency in used}
+    rates_data = json.dumps(used_rates, separators=(',', ':')) if used_rates else None
+    stats = {'serverCount': str(len(view.rows)), 'totalCost': f'¥{view.total:.2f}',
+             'expiringCount': str(view.expiring)}
+    result = []
+    for content in parts:
+        content = VIEW_RE.sub(lambda _: f'const vpsView = {data};', content, count=1)
+        content = CARDS_RE.sub(lambda _: cards, content, count=1)
+        if rates_data:
+            content = RATES_RE.sub(lambda _: f'const exchangeRates = {rates_data};', content, count=1)
+        for stat_id in STAT_IDS:
+            content = re.sub(rf'(id="{stat_id}"[^>]*>)[^<]*(<)', lambda m: m.group(1) + stats[stat_id] + m.group(2),
+                             content, count=1)
+        result.append(content)
+    return result
+
+
+def write_pages(files, directory=PAGE_DIR, write=None):
+    """写入内容有变化的页面文件，删除目录中不再需要的旧页面；返回写入的文件数"""
+    written = 0
+    if files:
+        os.makedirs(directory, exist_ok=True)
+    for path, content in files.items():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if f.read() == content:
+                    continue
+        except OSError:
+            pass
+        write(path, content)
+        written += 1
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.js') and path not in files:
+                os.remove(path)
+    return written
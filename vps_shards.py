@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+
+from vps_batch import ExpiryBatch
+from vps_costs import provider_of
+
+SHARD_DIR = 'shards'
+SHARD_KEYS = ('provider', 'owner', 'currency')
+UNGROUPED = '未分组'
+# 总数少于这个值时进程池的启动和传输开销大于收益，直接在当前进程计算
+PARALLEL_THRESHOLD = 50000
+# index.html 中引用分片文件的区域，重新生成时整体替换
+SCRIPTS_BEGIN = '<!-- vps-shards -->'
+SCRIPTS_END = '<!-- /vps-shards -->'
+SCRIPTS_RE = re.compile(re.escape(SCRIPTS_BEGIN) + r'.*?' + re.escape(SCRIPTS_END) + r'\n?', re.S)
+SCRIPT_SRC_RE = re.compile(r'<script src="([^"]+)"></script>')
+
+
+def shard_key(record, by):
+    """record 所属的分片：provider 为管理地址的域名，owner 为自定义字段 owner，currency 为币种"""
+    if by == 'provider':
+        return provider_of(record)
+    if by == 'owner':
+        return str((record.extra or {}).get('owner') or UNGROUPED)
+    if by == 'currency':
+        return record.currency
+    raise ValueError(f"不支持的分片方式: {by}，可选: {', '.join(SHARD_KEYS)}")
+
+
+def shard_path(key, directory=SHARD_DIR):
+    """分片文件路径，文件名中只保留安全字符
+
+    替换过字符（如 "a b" 和 "a_b"）或含大写字母（不区分大小写的文件系统）时加上 key 的短哈希，
+    不同的分片不会写到同一个文件
+    """
+    safe = re.sub(r'[^\w.-]+', '_', key).strip('._') or '_'
+    if safe != key or safe != safe.lower():
+        safe = f"{safe}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+    return os.path.join(directory, f'{safe}.js')
+
+
+def group_records(records, by):
+    """{分片: [record, ...]}，保持原有顺序"""
+    shards = {}
+    for record in records:
+        shards.setdefault(shard_key(record, by), []).append(record)
+    return shards
+
+
+def render_shard(key, records):
+    """分片文件内容：定义 vpsShards[key] 并追加到页面的 vpsServices 中（ding_monitor 也可以直接监控分片文件）"""
+    name = json.dumps(key, ensure_ascii=False)
+    return (
+        f"// VPS数据分片: {key}（由 vps_manager.py 生成）\n"
+        f"vpsShards[{name}] = {json.dumps([r.to_dict() for r in records], ensure_ascii=False, indent=4)};\n"
+        f"vpsShards[{name}].forEach(vps => vpsServices.push(vps));\n"
+    )
+
+
+def render_scripts(paths):
+    """index.html 中引用所有分片文件的 <script> 标签，放在页面脚本之后、DOMContentLoaded 之前执行"""
+    lines = [SCRIPTS_BEGIN, '<script>const vpsShards = {};</script>']
+    lines += [f'<script src="{path.replace(os.sep, "/")}"></script>' for path in paths]
+    lines.append(SCRIPTS_END)
+    return '\n'.join(lines) + '\n'
+
+
+def strip_scripts(html):
+    return SCRIPTS_RE.sub('', html)
+
+
+def script_paths(html):
+    """index.html 引用的分片文件路径（按页面中的顺序），不是分片模式时为空"""
+    match = SCRIPTS_RE.search(html)
+    if not match:
+        return []
+    return SCRIPT_SRC_RE.findall(match.group(0))
+
+
+def script_locations(html, page):
+    """页面引用的分片文件地址：page 为 URL 时相对于页面 URL，为本地文件时相对于页面所在目录"""
+    paths = script_paths(html)
+    if page.startswith(('http://', 'https://')):
+        return [urljoin(page, path) for path in paths]
+    base = os.path.dirname(os.path.abspath(page))
+    return [os.path.join(base, *path.split('/')) for path in paths]
+
+
+def check_loaded(count, locations):
+    """分片模式的页面本身是空列表，引用了分片文件却一台VPS都没读到说明分片缺失或无法解析，不能当作没有服务器"""
+    if locations and not count:
+        raise ValueError(f"页面引用了 {len(locations)} 个分片文件，但没有读取到任何VPS")
+
+
+def _evaluate(records, today, min_days, max_days):
+    """在子进程中计算一个分片：返回 ([(分片内序号, 剩余天数)], 分桶计数, 币种统计)"""
+    batch = ExpiryBatch(records)
+    positions = {id(record): i for i, record in enumerate(batch.records)}
+    expiring = [(positions[id(record)], days) for record, days in batch.expiring(today, min_days, max_days)]
+    return expiring, batch.bucket_counts(today), batch.currency_totals()
+
+
+def _evaluate_all(shards, today, min_days, max_days, workers):
+    """{分片: _evaluate 的结果}"""
+    keys = list(shards)
+    args = [(shards[key], today, min_days, max_days) for key in keys]
+    total = sum(len(records) for records in shards.values())
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(keys) < 2 or total < PARALLEL_THRESHOLD:
+        results = [_evaluate(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_evaluate, *zip(*args)))
+    return dict(zip(keys, results))
+
+
+def _merge(shards, results):
+    expiring, buckets, currencies = [], {}, {}
+    for key, records in shards.items():
+        shard_expiring, shard_buckets, shard_currencies = results[key]
+        expiring.extend((records[i], days, key) for i, days in shard_expiring)
+        for label, count in shard_buckets.items():
+            buckets[label] = buckets.get(label, 0) + count
+        for currency, (count, cost) in shard_currencies.items():
+            old_count, old_cost = currencies.get(currency, (0, 0.0))
+            currencies[currency] = (old_count + count, old_cost + cost)
+    expiring.sort(key=lambda item: item[1])
+    return expiring, buckets, currencies
+
+
+def evaluate_shards(shards, today, min_days=None, max_days=None, workers=None):
+    """按分片并行计算到期情况和币种统计，再合并各分片的结果
+
+    返回 (到期列表 [(record, 剩余天数, 分片)]（按剩余天数排序）, 分桶计数, {币种: (数量, 总费用)})。
+    workers 默认为CPU核数；只有一个核、只有一个分片或总数少于 PARALLEL_THRESHOLD 时不启动进程池
+    """
+    return _merge(shards, _evaluate_all(shards, today, min_days, max_days, workers))
+
+
+class ShardEvaluator:
+    """常驻检查时保存每个分片上一次的计算结果，只重新计算有变化的分片
+
+    分片中的记录对象都没变（VPSStore.load 对未修改的行沿用同一对象）且日期、提醒范围相同时直接使用上次的结果
+    """
+
+    def __init__(self):
+        self.params = None
+        self.results = {}
+        self.evaluated = 0
+
+    def evaluate(self, shards, today, min_days=None, max_days=None, workers=None):
+        """与 evaluate_shards 相同；evaluated 为本次重新计算的分片数"""
+        params = (today, min_days, max_days)
+        if params != self.params:
+            self.params, self.results = params, {}
+        changed = {
+            key: records for key, records in shards.items()
+            if key not in self.results or not _same_records(self.results[key][0], records)
+        }
+        for key, result in _evaluate_all(changed, today, min_days, max_days, workers).items():
+            self.results[key] = (list(changed[key]), result)
+        self.results = {key: self.results[key] for key in shards}
+        self.evaluated = len(changed)
+        return _merge(shards, {key: result for key, (_, result) in self.results.items()})
+
+
+def _same_records(old, new):
+    return len(old) == len(new) and all(a is b for a, b in zip(old, new))
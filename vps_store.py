@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+
+from vps_record import VPSRecord
+
+
+def _umask():
+    # os.umask 只能先设置再恢复，进程启动时读取一次
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _umask()
+
+
+def file_mode(path):
+    """path 现有的权限；新文件按 open() 创建时的权限（0o666 去掉 umask）"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~UMASK
+
+
+def atomic_write(path, content, encoding='utf-8'):
+    """先写临时文件再重命名，写到一半崩溃也不会留下残缺文件；content 为 bytes 时按二进制写入"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        binary = isinstance(content, bytes)
+        with os.fdopen(fd, 'wb' if binary else 'w', encoding=None if binary else encoding,
+                       newline=None if binary else '') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 创建的文件只有所有者可读写，改为与原文件相同，否则网页服务器读不到生成的页面
+        os.chmod(tmp_path, file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class VPSStore:
+    """VPS数据存储（SQLite），index.html 只是由它生成的展示页面"""
+
+    def __init__(self, db_file='vps_data.db'):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS vps (
+                    id INTEGER PRIMARY KEY,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+        self._drop_lookup_columns()
+
+    def _drop_lookup_columns(self):
+        """早期的库带有 name、next_due_date 列和索引；到期查询和按名称查找都在内存中完成，重建表去掉它们"""
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(vps)')}
+        if columns <= {'id', 'data'}:
+            return
+        self.conn.executescript("""
+            BEGIN;
+            CREATE TABLE vps_new (
+                id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            INSERT INTO vps_new (id, data) SELECT id, data FROM vps;
+            DROP TABLE vps;
+            ALTER TABLE vps_new RENAME TO vps;
+            COMMIT;
+        """)
+
+    @staticmethod
+    def _row(record):
+        return json.dumps(record.to_dict(), ensure_ascii=False)
+
+    @staticmethod
+    def _records(rows):
+        return [(vps_id, VPSRecord.from_dict(json.loads(data))) for vps_id, data in rows]
+
+    def is_empty(self):
+        return self.conn.execute('SELECT 1 FROM vps LIMIT 1').fetchone() is None
+
+    def load(self, cache=None):
+        """按录入顺序返回 [(id, record), ...]
+
+        cache 为 {id: (data, record)}（常驻监控时跨多次载入保存）：内容没有变化的行直接沿用上次的记录对象，
+        只解析有变化的行，并把 cache 更新为本次的内容。沿用的记录对象是共享的，调用方不能修改
+        """
+        rows = self.conn.execute('SELECT id, data FROM vps ORDER BY id')
+        if cache is None:
+            return self._records(rows)
+        result, seen = [], {}
+        for vps_id, data in rows:
+            cached = cache.get(vps_id)
+            record = cached[1] if cached and cached[0] == data else VPSRecord.from_dict(json.loads(data))
+            seen[vps_id] = (data, record)
+            result.append((vps_id, record))
+        cache.clear()
+        cache.update(seen)
+        return result
+
+    def replace_all(self, records):
+        """用新的列表整体替换存储内容（导入旧数据时使用），返回新的 id 列表"""
+        with self.conn:
+            self.conn.execute('DELETE FROM vps')
+            self.conn.executemany(
+                'INSERT INTO vps (id, data) VALUES (?, ?)',
+                ((i, self._row(record)) for i, record in enumerate(records, 1))
+            )
+        return list(range(1, len(records) + 1))
+
+    def apply(self, changes):
+        """在一个事务中应用一批修改：('put', id, record) 或 ('delete', id)"""
+        with self.conn:
+            for change in changes:
+                if change[0] == 'put':
+                    _, vps_id, record = change
+                    self.conn.execute(
+                        'INSERT OR REPLACE INTO vps (id, data) VALUES (?, ?)',
+                        (vps_id, self._row(record))
+                    )
+                elif change[0] == 'delete':
+                    self.conn.execute('DELETE FROM vps WHERE id = ?', (change[1],))
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                (key, json.dumps(value))
+            )
+
+    def close(self):
+        self.conn.close()